@@ -1,6 +1,27 @@
-from game import MightAndMagic
+import os
+import sys
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["bench"]:
+        from bench import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["pack"]:
+        from asset_pack import build_pack
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))  # Assets and the pack are relative to the package
+        print(f"Packed {build_pack()} assets.")
+        sys.exit(0)
+    if sys.argv[1:2] == ["simulate"]:
+        from simulation import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] in (["record"], ["replay"]):
+        from replay import main
+        sys.exit(main(sys.argv[1:]))
+    if "--metrics" in sys.argv[1:-1]:
+        from metrics import metrics
+        metrics.start(sys.argv[sys.argv.index("--metrics") + 1])  # Dump frame metrics to the given .json or .csv
+    if "--dungeon-size" in sys.argv[1:-1]:
+        from states import NewGameState
+        NewGameState.dungeon_size = int(sys.argv[sys.argv.index("--dungeon-size") + 1])  # From CHUNKED_DUNGEON_SIZE, rooms are generated as they are explored
+    from game import MightAndMagic
     might_and_magic = MightAndMagic()
     might_and_magic.main_loop()
-    
\ No newline at end of file
@@ -0,0 +1,129 @@
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+from cache import AssetCache
+from constants import ASSET_PACK_PATH
+
+PACK_MAGIC = b"MMPK"
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct("<4sII")  # Magic, version, length of the JSON index
+
+
+class AssetPack:
+    """
+    A read-only archive of pre-decoded, pre-scaled images, memory-mapped so surfaces are created
+    straight from the mapped pixels without reading or decoding files.
+
+    The archive is a header, a JSON index and the raw pixels of every image. Each index entry holds the
+    image's asset cache key, pixel format, size, the position of its pixels after the index, and the size
+    and modification time of its source file, so images whose source changed after packing are skipped.
+    """
+    def __init__(self, path):
+        """
+        Opens and maps the archive at path.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = PACK_HEADER.unpack_from(self.map, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {PACK_VERSION} asset pack.")
+        index = json.loads(self.map[PACK_HEADER.size:PACK_HEADER.size + index_length].decode("utf-8"))
+        self.data_start = PACK_HEADER.size + index_length  # Pixel offsets in the index are relative to this
+        self.entries = {}  # Index entries by asset cache key
+        for entry in index:
+            name, folder, with_alpha, scale, size = entry["key"]
+            key = (name, folder, with_alpha, scale, tuple(size) if size is not None else None)
+            if source_stamp(name, folder) == entry["source"]:
+                self.entries[key] = entry
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def surface(self, key):
+        """
+        Returns a surface sharing the archive's pixels for the asset, or None if the asset is not packed.
+        The surface is read-only and only valid while the pack is open.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        start = self.data_start + entry["offset"]
+        pixels = memoryview(self.map)[start:start + entry["length"]]
+        return pygame.image.frombuffer(pixels, tuple(entry["size"]), entry["format"])
+
+    def close(self):
+        """
+        Unmaps and closes the archive.
+        """
+        self.map.close()
+        self.file.close()
+
+
+def source_stamp(name, folder):
+    """
+    Returns the size and modification time of an asset's source file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(os.path.join("assets", folder, name))
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def build_pack(path=ASSET_PACK_PATH, manifest=None):
+    """
+    Decodes and scales every asset of the manifest and writes their raw pixels into an archive at path.
+    Returns the number of assets packed.
+    """
+    if manifest is None:
+        from preloader import build_manifest
+        manifest = build_manifest()
+    index = []
+    blobs = []
+    offset = 0
+    for key in manifest:
+        surface = AssetCache.decode_file(key)
+        pixel_format = "RGBA" if key[2] else "RGB"
+        pixels = pygame.image.tobytes(surface, pixel_format)
+        name, folder, with_alpha, scale, size = key
+        index.append({
+            "key": [name, folder, with_alpha, scale, list(size) if size is not None else None],
+            "format": pixel_format,
+            "size": list(surface.get_size()),
+            "offset": offset,
+            "length": len(pixels),
+            "source": source_stamp(name, folder),
+        })
+        blobs.append(pixels)
+        offset += len(pixels)
+    encoded = json.dumps(index).encode("utf-8")
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as pack:
+        pack.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(encoded)))
+        pack.write(encoded)
+        for pixels in blobs:
+            pack.write(pixels)
+    os.replace(temporary, path)
+    return len(index)
+
+
+def open_pack(cache, path=ASSET_PACK_PATH):
+    """
+    Attaches the archive at path to an asset cache if it exists, so packed assets skip decoding.
+    Assets missing from the archive keep loading from their files. Returns the pack, or None.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        pack = AssetPack(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error opening asset pack: {e}")
+        return None
+    cache.pack = pack
+    return pack
@@ -0,0 +1,782 @@
+"""
+Headless benchmarks for the game's hot paths.
+Run with: python mightandmagic bench [name ...] [--seed N] [--frames N] [--profile PATH] [--no-alloc]
+"""
+import argparse
+import cProfile
+import hashlib
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from constants import DUNGEON_SIZE, EVENT_CODES, INTRO_DURATION, SCREEN_HEIGHT, SCREEN_WIDTH, UPDATE_RATE
+
+
+def init_headless():
+    """
+    Initializes pygame against the dummy video driver and returns the display surface.
+    Autosaving is turned off, so headless runs write no saves and time no save I/O.
+    """
+    from states import NewGameState
+
+    NewGameState.autosave_moves = 0
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # Assets are loaded relative to the package
+    pygame.init()
+    return pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+
+def percentile(samples, fraction):
+    """
+    Returns the sample at the given fraction (0..1) of the sorted samples.
+    """
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_frames(frame, frames):
+    """
+    Calls frame() the given number of times and returns the duration of each call in milliseconds.
+    """
+    samples = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        frame()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    """
+    Prints the mean and percentiles of frame time samples in milliseconds.
+    """
+    mean = sum(samples) / len(samples)
+    print(
+        f"{label:<40} mean {mean:8.3f} ms  p50 {percentile(samples, 0.5):8.3f} ms  "
+        f"p95 {percentile(samples, 0.95):8.3f} ms  p99 {percentile(samples, 0.99):8.3f} ms"
+    )
+
+
+def legacy_draw_room_description(room, screen):
+    """
+    The per-frame room description drawing the game used before panels were prerendered.
+    """
+    font = pygame.font.Font(None, 36)
+    paper = pygame.image.load("assets/backgrounds/empty4.jpg")
+    text = font.render(room.description, True, (0, 0, 0))
+    paper.blit(text, (50, 50))
+    screen.blit(pygame.transform.scale(paper, (300, 200)), (250, 200))
+
+
+def bench_room_description(screen, args):
+    """
+    Compares drawing a room description every frame before and after prerendering the panel.
+    """
+    from room import Room
+
+    room = Room("This is a room.", "empty", {})
+    report("room description (legacy)", time_frames(lambda: legacy_draw_room_description(room, screen), args.frames))
+    room.draw_room_description(screen)  # Build the panel outside the timed frames
+    report("room description (panel)", time_frames(lambda: room.draw_room_description(screen), args.frames))
+
+
+def bench_room_image(screen, args):
+    """
+    Compares scaling the room background on every draw with blitting the pre-scaled surface.
+    """
+    from room import Room
+
+    room = Room("This is a room.", "empty", {})
+    legacy_image = pygame.image.load("assets/backgrounds/empty1.jpg").convert()
+    report("room image (legacy scale)", time_frames(
+        lambda: screen.blit(pygame.transform.scale(legacy_image, (800, 600)), (0, 0)), args.frames))
+    room.draw_room_image(screen)  # Load the image outside the timed frames
+    report("room image (pre-scaled)", time_frames(lambda: room.draw_room_image(screen), args.frames))
+
+
+def bench_text(screen, args):
+    """
+    Compares building a font and rendering the direction labels every frame with the shared text cache.
+    """
+    from text import render_text, text_cache
+
+    labels = ["North", "South", "East", "West"]
+
+    def legacy_frame():
+        for label in labels:
+            font = pygame.font.Font(None, 24)
+            screen.blit(font.render(label, True, (50, 50, 50)), (0, 0))
+
+    def cached_frame():
+        for label in labels:
+            screen.blit(render_text(label, 24, (50, 50, 50)), (0, 0))
+
+    report("labels (font per frame)", time_frames(legacy_frame, args.frames))
+    cached_frame()  # Render the labels once outside the timed frames
+    renders = text_cache.renders
+    report("labels (text cache)", time_frames(cached_frame, args.frames))
+    print(f"{'text cache renders':<40} {text_cache.renders - renders} during {args.frames} steady-state frames")
+
+
+def traced_bytes(build):
+    """
+    Calls build() and returns its result with the bytes of Python memory it left allocated.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def bench_dungeon_memory(screen, args, size=200):
+    """
+    Compares the memory per cell of a Dungeon of Room objects with a CompactDungeon of event codes.
+    """
+    from dungeon import CompactDungeon, Dungeon
+
+    for cls in (Dungeon, CompactDungeon):
+        random.seed(args.seed)
+        dungeon, allocated = traced_bytes(lambda: cls(size))
+        print(f"{cls.__name__ + f' {size}x{size}':<40} {allocated / (size * size):10.1f} bytes per cell")
+
+
+def best_of(run, repeats=3):
+    """
+    Calls run() repeats times and returns the fastest duration in seconds.
+    """
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_generation(screen, args, size=1000):
+    """
+    Compares generating the events of a size x size dungeon with one select_event call per room
+    against generate_events, in one pass and in chunks. generate_events is only vectorized with NumPy;
+    without it the rows are labelled with the pure Python fallback.
+    """
+    import generation
+    from dungeon import CompactDungeon
+    from generation import generate_events, np
+
+    cells = size * size
+    reference = CompactDungeon(size, events=bytes(cells))
+    random.seed(args.seed)
+    backend = "vectorized" if np is not None else "python fallback"
+    for label, run in (
+        ("select_event per room", reference.generate_rooms),
+        (backend, lambda: generate_events(size, args.seed)),
+        (backend + ", chunked", lambda: generate_events(size, args.seed, chunk_size=64)),
+    ):
+        seconds = best_of(run, repeats=1 if run is reference.generate_rooms else 3)
+        print(f"{'generate ' + label:<40} {seconds * 1000:10.1f} ms  {seconds * 1e9 / cells:8.1f} ns per cell")
+    print(f"{'generation backend':<40} {'numpy' if np is not None else 'python'}")
+    if np is not None:
+        vectorized = generate_events(100, args.seed)
+        generation.np = None
+        try:
+            same = generate_events(100, args.seed) == vectorized
+        finally:
+            generation.np = np
+        print(f"{'numpy and python streams':<40} {'identical' if same else 'DIFFER'} for a 100x100 dungeon")
+
+
+def bench_chunked(screen, args, steps=2000):
+    """
+    Measures startup time and memory of a ChunkedDungeon at growing sizes, followed by a random walk of steps moves,
+    and the time to load a chunk as changed rooms accumulate elsewhere in the dungeon.
+    """
+    from dungeon import ChunkedDungeon
+
+    for size in (100, 10_000, 1_000_000):
+        start = time.perf_counter()
+        dungeon, allocated = traced_bytes(lambda: ChunkedDungeon(size, seed=args.seed))
+        startup = time.perf_counter() - start
+        rng = random.Random(args.seed)
+        position = (size // 2, size // 2)
+
+        def walk():
+            nonlocal position
+            for _ in range(steps):
+                dungeon.visit(*position)
+                position = rng.choice(list(dungeon.generate_directions(*position).values()))
+
+        start = time.perf_counter()
+        _, walked = traced_bytes(walk)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{f'chunked {size}x{size}':<40} startup {startup * 1000:7.2f} ms {allocated / 1024:7.1f} KiB  "
+            f"walk {elapsed * 1e6 / steps:7.1f} us/move, {len(dungeon.chunks)} chunks {walked / 1024:7.1f} KiB"
+        )
+
+    dungeon = ChunkedDungeon(1_000_000, seed=args.seed)
+    for edits in (0, 100_000):
+        rng = random.Random(args.seed)
+        for _ in range(edits):
+            dungeon.set_event(rng.randrange(dungeon.size), rng.randrange(dungeon.size), "empty")
+
+        def reload():
+            dungeon.chunks.clear()
+            dungeon.load_chunk((0, 0))
+
+        print(f"{f'chunk load with {edits} changed rooms':<40} {best_of(reload) * 1000:10.3f} ms")
+
+
+def bench_asset_pack(screen, args):
+    """
+    Compares loading every asset of the preload manifest from the image files and from an asset pack.
+    """
+    import tempfile
+
+    from asset_pack import AssetPack, build_pack
+    from cache import AssetCache
+    from preloader import build_manifest
+
+    manifest = build_manifest()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.pack")
+        build_pack(path, manifest)
+        cache = AssetCache(0)
+        seconds = best_of(lambda: [cache.load(key) for key in manifest])
+        print(f"{'load manifest from files':<40} {seconds * 1000:10.1f} ms  ({len(manifest)} assets)")
+        cache.pack = AssetPack(path)
+        seconds = best_of(lambda: [cache.load(key) for key in manifest])
+        print(f"{'load manifest from pack':<40} {seconds * 1000:10.1f} ms  ({os.path.getsize(path) / 2 ** 20:.1f} MiB mapped)")
+        cache.pack.close()
+
+
+def bench_navigation(screen, args, size=1000):
+    """
+    Measures building a navigation index over a size x size CompactDungeon and answering queries on it.
+    """
+    from dungeon import CompactDungeon
+    from navigation import NavigationIndex
+
+    dungeon = CompactDungeon(size, seed=args.seed)
+    start = time.perf_counter()
+    navigation = NavigationIndex(dungeon)
+    print(f"{f'navigation index {size}x{size}':<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    for label, query in (
+        ("distance to exit", lambda: navigation.distance_to_exit(0, 0)),
+        ("path to exit", lambda: navigation.path_to_exit(0, 0)),
+        ("A* corner to corner", lambda: navigation.shortest_path((0, 0), (size - 1, size - 1))),
+        ("nearest treasure", lambda: navigation.nearest(size // 2, size // 2, 'treasure')),
+    ):
+        print(f"{'navigation ' + label:<40} {best_of(query) * 1000:10.3f} ms")
+    blocked = NavigationIndex(dungeon, ('trap', 'encounter'))
+    print(f"{'navigation reach exit around traps':<40} {str(blocked.all_reach_exit()):>10}")
+    room = next((i, j) for i in range(size) for j in range(size) if dungeon.event_at(i, j) == 'trap')
+    start = time.perf_counter()
+    dungeon.set_event(*room, 'empty')
+    print(f"{'navigation update after set_event':<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+
+def bench_simulation(screen, args, runs=2000):
+    """
+    Measures simulation throughput with one worker process per core, and with up to four workers.
+    Asserts every worker count gives the same statistics as a single worker, since the runs are seeded by number.
+    """
+    from player import Warrior
+    from simulation import run_batch
+
+    expected = throughput = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        stats = run_batch(Warrior, runs, size=12, seed=args.seed, workers=workers)
+        elapsed = time.perf_counter() - start
+        expected = expected or stats
+        throughput = throughput or runs / elapsed
+        assert stats == expected, f"simulating with {workers} workers differs from 1 worker"
+        print(f"{f'simulate {workers} worker(s)':<40} {runs / elapsed:10.0f} runs/s  x{runs / elapsed / throughput:.2f}"
+              f"  exit rate {stats['exit_rate']:.3f}")
+
+
+def bench_combat(screen, args, hits=10 ** 6, players=10 ** 5):
+    """
+    Measures resolving 10^6 hits one Player.take_damage call at a time against batches in combat.py,
+    and checks both give the same health for the same damage rolls.
+    """
+    import combat
+    from generation import derive_seed
+    from player import Rogue, Warrior, Wizard
+
+    classes = (Rogue, Wizard, Warrior)
+    roster = [classes[k % 3](classes[k % 3].__name__) for k in range(players)]
+    rounds = hits // players
+    health, defense = combat.player_arrays(roster)
+    damage = [combat.damage_rolls(5, 30, players, derive_seed(args.seed, r)) for r in range(rounds)]
+
+    start = time.perf_counter()
+    for r in range(rounds):
+        health = combat.resolve_hits(health, defense, damage[r])
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for r in range(rounds):
+        combat.reference_resolve_hits(roster, damage[r])
+    scalar = time.perf_counter() - start
+
+    assert [int(value) for value in health] == [player.health for player in roster], "batch and scalar combat differ"
+    backend = "numpy" if combat.np is not None else "python"
+    print(f"{'combat take_damage per hit':<40} {scalar:10.3f} s")
+    print(f"{f'combat batch ({backend})':<40} {batch:10.3f} s  x{scalar / batch:.0f}")
+
+
+def bench_entity_memory(screen, args, count=10 ** 5):
+    """
+    Compares the memory per entity of dict-backed players and items, as they were before __slots__,
+    with the slotted classes and a PlayerStore.
+    """
+    from entities import PlayerStore
+    from inventory import Gold, Inventory
+    from player import Warrior
+
+    class DictWarrior:
+        def __init__(self, name):
+            self.name, self.health, self.defense, self.dodge = name, 120, 20, 5
+            self.inventory, self.level, self.exp, self.weapon, self.strength = Inventory(), 1, 0, None, 10
+
+    class DictGold:
+        def __init__(self, amount):
+            self.name, self.description, self.type, self.amount = 'Gold', f'{amount} gold coins', 'gold', amount
+
+    def store():
+        players = PlayerStore()
+        for _ in range(count):
+            players.add("Warrior", 120, 20, 5)
+        return players
+
+    builds = (
+        ("players dict-backed", lambda: [DictWarrior("Warrior") for _ in range(count)]),
+        ("players __slots__", lambda: [Warrior("Warrior") for _ in range(count)]),
+        ("players PlayerStore", store),
+        ("gold dict-backed", lambda: [DictGold(10) for _ in range(count)]),
+        ("gold __slots__", lambda: [Gold(10) for _ in range(count)]),
+    )
+    for label, build in builds:
+        entities, allocated = traced_bytes(build)
+        print(f"{label:<40} {allocated / count:10.1f} bytes per entity")
+        del entities
+
+
+def bench_inventory(screen, args, count=50000, queries=10000):
+    """
+    Measures a merchant inventory of tens of thousands of items: bulk adding and removing them,
+    and aggregate queries answered from the index compared with scanning a list of the items.
+    """
+    from inventory import Consumable, Gold, Inventory, Weapon
+
+    rng = random.Random(args.seed)
+    stock = []
+    for number in range(count):
+        kind = rng.randrange(3)
+        if kind == 0:
+            stock.append(Weapon(f"Sword {number % 100}", "A sword", rng.randint(1, 20)))
+        elif kind == 1:
+            stock.append(Consumable(f"Potion {number % 100}", "A potion", None))
+        else:
+            stock.append(Gold(rng.randint(1, 50)))
+
+    inventory = Inventory()
+    start = time.perf_counter()
+    inventory.add_items(stock)
+    added = time.perf_counter() - start
+
+    def indexed():
+        for _ in range(queries):
+            inventory.count_type('weapon')
+            inventory.has_item(Gold(inventory.gold))
+
+    def scanned():
+        for _ in range(queries // 100):
+            sum(1 for item in stock if item.type == 'weapon')
+            sum(item.amount for item in stock if item.type == 'gold')
+
+    print(f"{f'inventory add_items {count}':<40} {added * 1000:10.2f} ms")
+    print(f"{'inventory indexed query':<40} {best_of(indexed) / queries * 1e6:10.2f} us")
+    print(f"{'inventory scanned query':<40} {best_of(scanned) / (queries // 100) * 1e6:10.2f} us")
+    start = time.perf_counter()
+    removed = inventory.remove_items(stock)
+    elapsed = time.perf_counter() - start
+    print(f"{f'inventory remove_items {removed}':<40} {elapsed * 1000:10.2f} ms")
+
+
+def bench_savegame(screen, args, size=1000, changes=10):
+    """
+    Measures full saves, delta saves after a few rooms changed, and loads of a size x size dungeon.
+    """
+    import tempfile
+
+    from dungeon import CompactDungeon
+    from player import Warrior
+    from savegame import SaveFile
+
+    rng = random.Random(args.seed)
+    dungeon = CompactDungeon(size, seed=args.seed)
+    player = Warrior("Warrior")
+    with tempfile.TemporaryDirectory() as directory:
+        save_file = SaveFile(os.path.join(directory, "bench.sav"))
+        full = best_of(lambda: save_file.write_full(dungeon, (0, 0), player))
+
+        def delta():
+            for _ in range(changes):
+                dungeon.set_event(rng.randrange(size), rng.randrange(size), 'empty')
+            return save_file.save(dungeon, (0, 0), player)
+
+        written = delta()
+        patched = best_of(delta)
+        loaded = best_of(save_file.load)
+    print(f"{f'save full {size}x{size}':<40} {full * 1000:10.2f} ms")
+    print(f"{f'save delta, {changes} rooms changed':<40} {patched * 1000:10.2f} ms  {written} bytes written")
+    print(f"{f'load {size}x{size}':<40} {loaded * 1000:10.2f} ms")
+
+
+def bench_input(screen, args, clicks=10000):
+    """
+    Compares the cost per click of checking every widget with Button.is_clicked against an InputRouter,
+    for growing numbers of 20x20 widgets spread over the screen.
+    """
+    from input_router import InputRouter
+
+    class Widget:
+        def __init__(self, rect):
+            self.rect = rect
+            self.callback = lambda: None
+
+        def is_clicked(self, event):
+            return event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos)
+
+    rng = random.Random(args.seed)
+    events = [click((rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT))) for _ in range(clicks)]
+    for count in (10, 100, 1000):
+        widgets = [Widget(pygame.Rect(rng.randrange(SCREEN_WIDTH - 20), rng.randrange(SCREEN_HEIGHT - 20), 20, 20))
+                   for _ in range(count)]
+        router = InputRouter()
+        for widget in widgets:
+            router.add(widget)
+
+        def scan():
+            for event in events:
+                for widget in widgets:
+                    if widget.is_clicked(event):
+                        break
+
+        def route():
+            for event in events:
+                router.dispatch(event)
+
+        print(f"{f'input {count} widgets, is_clicked scan':<40} {best_of(scan) / clicks * 1e6:10.2f} us per click")
+        print(f"{f'input {count} widgets, InputRouter':<40} {best_of(route) / clicks * 1e6:10.2f} us per click")
+
+
+def bench_room_change(screen, args, moves=300):
+    """
+    Measures the latency of moving to another room, from the click's callback to the end of the draw,
+    with the retained bottom UI buttons and with the buttons rebuilt on every move as before.
+    """
+    from constants import BUTTON_BG_IMAGE
+    from player import Rogue
+    from states import NewGameState
+    from utils import Button, image_loader
+
+    class RebuiltButton(Button):
+        def load_image(self):
+            # Loads the image as buttons did before they were retained: scaled to the screen, then to the button
+            image = image_loader(self.image_path, folder="backgrounds", with_alpha=True, scale=True)
+            self.image = pygame.transform.scale(image, self.rect.size)
+            self.image.set_colorkey((255, 255, 255))
+            self.surface = None
+            self.disabled_surface = None
+
+    def rebuild_bottom_ui(state):
+        bottom_ui = state.bottom_ui
+        bottom_ui.set_room_description(state.current_room().description)
+        for button in bottom_ui.buttons:
+            state.router.remove(button)
+        bottom_ui.buttons = [
+            RebuiltButton(BUTTON_BG_IMAGE, x, SCREEN_HEIGHT - 100, 100, 50, text)
+            for x, text in ((50, "North"), (210, "South"), (370, "East"), (530, "West"))
+        ]
+        for button in bottom_ui.buttons:
+            state.router.add(button, lambda direction=button.text.lower(): state.move(direction))
+        state.update_layers()
+
+    silence = open(os.devnull, "w")  # The dungeon prints its layout on every move when DEBUG is set
+    for label, rebuild in (("rebuilt", True), ("retained", False)):
+        random.seed(args.seed)
+        state = NewGameState(screen, Rogue("Rogue"))
+        if rebuild:
+            state.update_bottom_ui = lambda: rebuild_bottom_ui(state)
+        state.draw(screen)
+        rng = random.Random(args.seed)
+
+        def change_room():
+            state.move(rng.choice(list(state.current_room().directions)))
+            state.draw(screen)
+
+        stdout, sys.stdout = sys.stdout, silence
+        try:
+            samples = time_frames(change_room, moves)
+        finally:
+            sys.stdout = stdout
+        report(f"room change, buttons {label}", samples)
+    silence.close()
+
+
+def bench_minimap(screen, args, moves=2000):
+    """
+    Measures a minimap move, which repaints only the cells it changed, against repainting the whole viewport,
+    on a small and a large dungeon, and the per-move print_dungeon it replaced.
+    """
+    from dungeon import CompactDungeon
+    from minimap import Minimap
+    from navigation import DIRECTION_NAMES
+
+    for size in (DUNGEON_SIZE, 1000):
+        dungeon = CompactDungeon(size, seed=args.seed)
+        minimap = Minimap(dungeon)
+        rng = random.Random(args.seed)
+        position = [size // 2, size // 2]
+        minimap.visit(*position)
+
+        def move():
+            direction = rng.choice(DIRECTION_NAMES)
+            position[:] = dungeon.generate_directions(*position).get(direction, position)
+            minimap.visit(*position)
+
+        report(f"minimap move {size}x{size}", time_frames(move, moves))
+        report(f"minimap full repaint {size}x{size}", time_frames(minimap.repaint, args.frames))
+        if size <= 100:
+            silence = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, silence
+            try:
+                samples = time_frames(dungeon.print_dungeon, args.frames)
+            finally:
+                sys.stdout = stdout
+                silence.close()
+            report(f"print_dungeon {size}x{size} to devnull", samples)
+
+
+def bench_viewport(screen, args):
+    """
+    Measures a frame of the scrolling map view, which blits only the cached chunks in view, on a small, a medium and
+    a large dungeon, against drawing every tile of the dungeon each frame.
+    """
+    from dungeon import CompactDungeon
+    from viewport import Viewport
+
+    for size in (DUNGEON_SIZE, 100, 1000):
+        dungeon = CompactDungeon(size, seed=args.seed)
+        viewport = Viewport(dungeon)
+        viewport.follow(size // 2, size // 2, snap=True)
+        camera = viewport.camera
+        limit = max(size * viewport.tile_size - camera.width, 0)
+
+        def scroll():
+            if limit:
+                camera.x = (camera.x + 3) % limit  # Pan three pixels a frame
+                camera.target = (camera.x, camera.y)
+            viewport.stale = True
+            screen.blit(viewport.render(), (0, 0))
+
+        viewport.chunks.clear()
+        report(f"viewport scroll {size}x{size}", time_frames(scroll, args.frames))
+        report(f"viewport cold chunk {size}x{size}", time_frames(
+            lambda: (viewport.chunks.clear(), viewport.chunk_surface((0, 0))), 50))
+        if size <= 100:
+            atlas, areas, tile = viewport.atlas.surface, viewport.atlas.areas, viewport.tile_size
+            tiles = [(atlas, (j * tile, i * tile), areas[EVENT_CODES[dungeon.event_at(i, j)]])
+                     for i in range(size) for j in range(size)]
+            report(f"every tile unculled {size}x{size}", time_frames(
+                lambda: screen.blits(tiles, doreturn=False), min(args.frames, 50)))
+
+
+def click(pos):
+    """
+    Returns a left mouse button press at pos.
+    """
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+
+def key(key_code):
+    """
+    Returns a key press of key_code.
+    """
+    return pygame.event.Event(pygame.KEYDOWN, key=key_code, mod=0, unicode="", scancode=0)
+
+
+DIRECTION_BUTTONS = {"north": (100, 725), "south": (260, 725), "east": (420, 725), "west": (580, 725)}  # Centres of the bottom UI buttons
+
+
+def walk_script(seed, frames):
+    """
+    Returns the scripted input for a walk through IntroState, MainMenuState, CharacterSelectState and NewGameState
+    as a list of per-frame event lists. Each menu is shown for the given number of frames before it is clicked through,
+    except the intro, which is skipped before it would move on by itself after INTRO_DURATION seconds. Then the
+    dungeon walk makes a move every fourth frame in directions drawn from a generator seeded with seed.
+    """
+    rng = random.Random(seed)
+    intro_frames = min(frames, INTRO_DURATION * UPDATE_RATE - 1)  # One logic step per frame, see run_walk
+    script = [[] for _ in range(intro_frames)] + [[key(pygame.K_RETURN)]]  # Intro
+    script += [[] for _ in range(frames)] + [[click((400, 310))]]  # Main menu: New Game
+    script += [[] for _ in range(frames)] + [[click((100, 690))]]  # Character select: Rogue
+    for frame in range(frames * 4):  # Dungeon walk
+        if frame % 4 == 0:
+            script.append([click(DIRECTION_BUTTONS[rng.choice(list(DIRECTION_BUTTONS))])])
+        else:
+            script.append([])
+    return script
+
+
+def run_walk(script, seed, on_frame=None):
+    """
+    Plays the script through a fresh MightAndMagic, running one logic step per frame.
+    on_frame(state_name, seconds) is called after each frame. Returns the game.
+    """
+    from game import MightAndMagic
+
+    random.seed(seed)  # Dungeon generation and room images use the global generator
+    game = MightAndMagic()
+    for events in script:
+        state_name = type(game.state).__name__
+        start = time.perf_counter()
+        game._step(events, 1)
+        if on_frame is not None:
+            on_frame(state_name, time.perf_counter() - start)
+    return game
+
+
+def walk_fingerprint(game):
+    """
+    Returns a short digest of the dungeon layout and player position, identical for identical runs.
+    A ChunkedDungeon is digested from its seed and changed rooms, so no chunk is generated.
+    """
+    digest = hashlib.sha1()
+    dungeon = getattr(game.state, "dungeon", None)
+    if dungeon is not None:
+        if getattr(dungeon, "chunked", False):
+            digest.update(repr((dungeon.seed, dungeon.size, sorted(dungeon.iter_overrides()))).encode())
+        else:
+            digest.update(dungeon.event_grid())
+        digest.update(repr(game.state.player_position).encode())
+    return digest.hexdigest()[:12]
+
+
+def bench_walk(screen, args):
+    """
+    Drives a scripted walk from the intro to the dungeon and reports per-state frame time percentiles,
+    Python allocations traced with tracemalloc (SDL pixel buffers are not traced) and optionally a cProfile dump.
+    """
+    script = walk_script(args.seed, args.frames)
+    silence = open(os.devnull, "w")  # The dungeon prints its layout on every move when DEBUG is set
+    phases = {}
+
+    def record_time(state_name, seconds):
+        phases.setdefault(state_name, []).append(seconds * 1000)
+
+    profiler = cProfile.Profile() if args.profile else None
+    stdout, sys.stdout = sys.stdout, silence
+    try:
+        if profiler is not None:
+            profiler.enable()
+        game = run_walk(script, args.seed, record_time)
+        if profiler is not None:
+            profiler.disable()
+    finally:
+        sys.stdout = stdout
+    for state_name, samples in phases.items():
+        report(f"walk {state_name} ({len(samples)} frames)", samples)
+    print(f"{'walk fingerprint':<40} {walk_fingerprint(game)} (seed {args.seed})")
+    if profiler is not None:
+        profiler.dump_stats(args.profile)
+        print(f"{'walk profile':<40} written to {args.profile}")
+
+    if args.alloc:
+        # Allocations are traced in a second, identical run so tracing does not skew the frame times
+        allocations = {}
+
+        def record_allocations(state_name, seconds):
+            current, peak = tracemalloc.get_traced_memory()
+            totals = allocations.setdefault(state_name, [0, 0])
+            totals[0] = max(totals[0], peak)
+            totals[1] = current
+            tracemalloc.reset_peak()
+
+        tracemalloc.start()
+        stdout, sys.stdout = sys.stdout, silence
+        try:
+            run_walk(script, args.seed, record_allocations)
+        finally:
+            sys.stdout = stdout
+            tracemalloc.stop()
+        for state_name, (peak, current) in allocations.items():
+            print(f"{'alloc ' + state_name:<40} peak {peak / 1024:10.1f} KiB  traced at end {current / 1024:10.1f} KiB")
+    silence.close()
+
+
+BENCHMARKS = {
+    "room_description": bench_room_description,
+    "room_image": bench_room_image,
+    "text": bench_text,
+    "walk": bench_walk,
+    "dungeon_memory": bench_dungeon_memory,
+    "generation": bench_generation,
+    "chunked": bench_chunked,
+    "asset_pack": bench_asset_pack,
+    "navigation": bench_navigation,
+    "simulation": bench_simulation,
+    "combat": bench_combat,
+    "entity_memory": bench_entity_memory,
+    "inventory": bench_inventory,
+    "savegame": bench_savegame,
+    "input": bench_input,
+    "room_change": bench_room_change,
+    "minimap": bench_minimap,
+    "viewport": bench_viewport,
+}
+
+
+def parse_args(argv):
+    """
+    Parses the benchmark command line.
+    """
+    parser = argparse.ArgumentParser(prog="mightandmagic bench", description="Headless benchmarks for Might and Magic.")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for dungeon generation and scripted input")
+    parser.add_argument("--frames", type=int, default=300, help="frames timed per benchmark or phase")
+    parser.add_argument("--profile", metavar="PATH", help="write cProfile stats of the walk to PATH")
+    parser.add_argument("--no-alloc", dest="alloc", action="store_false", help="skip the tracemalloc run of the walk")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    """
+    Runs the benchmarks named in argv, or all of them when none are given.
+    """
+    args = parse_args(argv)
+    names = args.names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+        return 2
+    screen = init_headless()
+    for name in names:
+        BENCHMARKS[name](screen, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
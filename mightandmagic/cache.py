@@ -0,0 +1,225 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+from constants import ASSET_CACHE_BUDGET, SCREEN_HEIGHT, SCREEN_WIDTH
+from metrics import metrics
+
+
+def surface_bytes(surface):
+    """
+    Returns the number of bytes occupied by a surface's pixel data.
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+def asset_key(name, folder="backgrounds", with_alpha=True, scale=True, size=None):
+    """
+    Builds the cache key for an image asset.
+    The target size only takes part in the key when the image is scaled.
+    """
+    if scale:
+        size = tuple(size) if size is not None else (SCREEN_WIDTH, SCREEN_HEIGHT)
+    else:
+        size = None
+    return (name, folder, with_alpha, scale, size)
+
+
+class SurfaceCache:
+    """
+    A least-recently-used cache of surfaces, bounded by the bytes their pixels occupy.
+    """
+    def __init__(self, budget):
+        """
+        Initializes an empty cache with a byte budget.
+        """
+        self.budget = budget  # Maximum number of pixel bytes kept alive by the cache
+        self.entries = OrderedDict()  # Cached surfaces, least recently used first
+        self.size_bytes = 0  # Pixel bytes currently held
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def lookup(self, key):
+        """
+        Returns the surface stored under the key and marks it as recently used, or None on a miss.
+        """
+        surface = self.entries.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return surface
+
+    def put(self, key, surface):
+        """
+        Stores a surface under the key, evicting the least recently used entries once the budget is exceeded.
+        The newest entry is always kept, even if it alone is larger than the budget.
+        """
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size_bytes -= surface_bytes(old)
+        self.entries[key] = surface
+        self.size_bytes += surface_bytes(surface)
+        while self.size_bytes > self.budget and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size_bytes -= surface_bytes(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drops every cached surface. The counters are kept.
+        """
+        self.entries.clear()
+        self.size_bytes = 0
+
+    def reset_stats(self):
+        """
+        Resets the hit, miss and eviction counters.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache counters.
+        """
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size_bytes,
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class AssetCache(SurfaceCache):
+    """
+    Cache of image assets decoded from disk, keyed by (name, folder, with_alpha, scale, size).
+    Surfaces are shared between callers, so they must be copied before being modified.
+    Assets can be decoded ahead of time by worker threads with prefetch(); only the final conversion
+    to the display format, which needs the display, happens on the main thread.
+    """
+    def __init__(self, budget):
+        """
+        Initializes an empty asset cache with a byte budget.
+        """
+        super().__init__(budget)
+        self.pending = {}  # Futures of assets being decoded by worker threads
+        self.pack = None  # Archive of pre-decoded assets, see asset_pack.py
+
+    def get(self, name, folder="backgrounds", with_alpha=True, scale=True, size=None):
+        """
+        Returns the image asset. On a miss it waits for the asset if it is being prefetched,
+        or decodes it from disk otherwise.
+        """
+        key = asset_key(name, folder, with_alpha, scale, size)
+        surface = self.lookup(key)
+        if surface is None:
+            if key in self.pending:
+                return self.finish(key)
+            surface = self.load(key)
+            self.put(key, surface)
+        return surface
+
+    def prefetch(self, keys, executor):
+        """
+        Starts decoding the assets in keys on the executor's workers.
+        Decoded assets are converted and cached by poll(), or by get() if they are needed before that.
+        """
+        for key in keys:
+            if key not in self.entries and key not in self.pending:
+                self.pending[key] = executor.submit(self.decode, key)
+
+    def finish(self, key):
+        """
+        Waits for a prefetched asset, converts it on the calling thread and caches it.
+        """
+        surface = self.finalize(self.pending.pop(key).result(), key)
+        metrics.count("asset_loads")
+        self.put(key, surface)
+        return surface
+
+    def poll(self, limit=None):
+        """
+        Converts and caches up to limit prefetched assets that finished decoding, without waiting.
+        Assets that failed to decode are dropped, so a later get() reports the error.
+        Returns the number of assets cached.
+        """
+        done = [key for key, future in self.pending.items() if future.done()]
+        if limit is not None:
+            done = done[:limit]
+        cached = 0
+        for key in done:
+            try:
+                self.finish(key)
+                cached += 1
+            except (pygame.error, OSError):
+                pass
+        return cached
+
+    def wait(self, keys):
+        """
+        Blocks until every prefetched asset in keys is decoded, converted and cached.
+        """
+        for key in keys:
+            if key in self.pending:
+                self.finish(key)
+
+    def load(self, key):
+        """
+        Decodes and converts the asset described by the key, bypassing the cache.
+        """
+        metrics.count("asset_loads")
+        return self.finalize(self.decode(key), key)
+
+    def decode(self, key):
+        """
+        Returns the asset's pixels from the asset pack if it holds them,
+        otherwise loads the image file and scales it to the target size if required.
+        """
+        if self.pack is not None:
+            surface = self.pack.surface(key)
+            if surface is not None:
+                return surface
+        return self.decode_file(key)
+
+    @staticmethod
+    def decode_file(key):
+        """
+        Loads the image file and scales it to the target size if required.
+        """
+        name, folder, _, scale, size = key
+        surface = pygame.image.load(os.path.join("assets", folder, name))
+        if scale:
+            surface = pygame.transform.scale(surface, size)
+        return surface
+
+    @staticmethod
+    def finalize(surface, key):
+        """
+        Converts a decoded image to the pixel format of the display.
+        """
+        if key[2]:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def warm(self, keys):
+        """
+        Loads every asset in keys into the cache ahead of time.
+        """
+        for key in keys:
+            self.get(*key)
+
+
+asset_cache = AssetCache(ASSET_CACHE_BUDGET)  # The process-wide asset cache
@@ -0,0 +1,66 @@
+"""
+Batch combat resolution for many players at once.
+The results match Player.take_damage hit for hit: Player.dodge_attack never dodges, so every attack
+deals max(0, damage - defense).
+"""
+import random
+
+from generation import derive_seed, uniform_stream
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches fall back to plain Python lists
+    np = None
+
+
+def damage_rolls(low, high, count, seed=None):
+    """
+    Returns count damage values between low and high inclusive, drawn from a stream seeded with seed,
+    or with fresh entropy if seed is None. The values are the same whether or not NumPy is installed,
+    see generation.uniform_stream.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    rolls = uniform_stream(derive_seed(seed, "damage"), count)
+    span = high - low + 1
+    if np is not None:
+        return low + (rolls * span).astype(np.int64)
+    return [low + int(roll * span) for roll in rolls]
+
+
+def resolve_hits(health, defense, damage):
+    """
+    Resolves one attack against each of many players.
+
+    Args:
+        health, defense: The players' attributes, as sequences or arrays of equal length.
+        damage: The damage of each attack, as a single number or one per player.
+
+    Returns:
+        The players' health after the attacks, as a NumPy array when NumPy is installed and a list otherwise.
+    """
+    if np is not None:
+        return np.asarray(health) - np.maximum(0, np.asarray(damage) - np.asarray(defense))
+    damages = damage if hasattr(damage, "__len__") else [damage] * len(health)
+    return [value - max(0, amount - armour) for value, amount, armour in zip(health, damages, defense)]
+
+
+def player_arrays(players):
+    """
+    Returns the health and defense of players as two columns for resolve_hits.
+    """
+    columns = ([p.health for p in players], [p.defense for p in players])
+    if np is not None:
+        return tuple(np.asarray(column) for column in columns)
+    return columns
+
+
+def reference_resolve_hits(players, damage):
+    """
+    Resolves one attack against each player by calling Player.take_damage one at a time, and returns the health
+    of every player afterwards. The scalar reference resolve_hits is checked against.
+    """
+    damages = damage if hasattr(damage, "__len__") else [damage] * len(players)
+    for player, amount in zip(players, damages):
+        player.take_damage(int(amount))
+    return [player.health for player in players]
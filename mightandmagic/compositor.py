@@ -0,0 +1,121 @@
+import pygame
+
+from metrics import metrics
+
+
+class Layer:
+    """
+    A surface drawn at a fixed position by the compositor.
+    """
+    def __init__(self, name, surface, pos, z):
+        """
+        Initializes the layer's name, surface, position and stacking order.
+        """
+        self.name = name  # The layer's name
+        self.surface = surface  # The layer's pixels, or None for an empty layer
+        self.pos = pos  # Top left corner of the layer on screen
+        self.z = z  # Layers with a higher z are drawn on top
+        self.visible = True  # Hidden layers are not drawn
+
+    @property
+    def rect(self):
+        """
+        The area of the screen covered by the layer.
+        """
+        if self.surface is None:
+            return pygame.Rect(self.pos, (0, 0))
+        return pygame.Rect(self.pos, self.surface.get_size())
+
+
+class Compositor:
+    """
+    Composites layers onto the screen and reports the regions that changed.
+    The screen keeps the composited image between frames, so only the regions of layers that changed are repainted.
+    """
+    def __init__(self, clear_color=(0, 0, 0)):
+        """
+        Initializes an empty compositor. The first render repaints the whole screen.
+        """
+        self.clear_color = clear_color  # Colour painted below every layer
+        self.layers = {}  # Layers by name
+        self.order = []  # Layers sorted by z
+        self.dirty = []  # Screen regions to repaint on the next render
+        self.full_redraw = True  # Whether the next render repaints the whole screen
+
+    def add(self, name, surface, pos=(0, 0), z=0):
+        """
+        Adds a layer and marks its area as changed.
+        """
+        layer = Layer(name, surface, pos, z)
+        self.layers[name] = layer
+        self.order.append(layer)
+        self.order.sort(key=lambda layer: layer.z)
+        self.dirty.append(layer.rect)
+        return layer
+
+    def set(self, name, surface=None, pos=None, visible=None):
+        """
+        Updates a layer's surface, position or visibility.
+        The old and new areas of the layer are marked as changed only if something actually changed.
+        """
+        layer = self.layers[name]
+        changed = False
+        old_rect = layer.rect
+        if surface is not None and surface is not layer.surface:
+            layer.surface = surface
+            changed = True
+        if pos is not None and tuple(pos) != tuple(layer.pos):
+            layer.pos = pos
+            changed = True
+        if visible is not None and visible != layer.visible:
+            layer.visible = visible
+            changed = True
+        if changed:
+            self.dirty.append(old_rect)
+            self.dirty.append(layer.rect)
+
+    def invalidate(self, rect=None):
+        """
+        Marks a region as changed, or the whole screen if no region is given.
+        """
+        if rect is None:
+            self.full_redraw = True
+        else:
+            self.dirty.append(pygame.Rect(rect))
+
+    def render(self, screen):
+        """
+        Repaints the changed regions of the screen and returns them as a list of rects.
+        """
+        if self.full_redraw:
+            regions = [screen.get_rect()]
+            self.full_redraw = False
+        else:
+            regions = merge_rects(rect for rect in self.dirty if rect.width and rect.height)
+        self.dirty = []
+        blits = 0
+        for region in regions:
+            screen.set_clip(region)
+            screen.fill(self.clear_color)
+            for layer in self.order:
+                if layer.visible and layer.surface is not None and region.colliderect(layer.rect):
+                    screen.blit(layer.surface, layer.pos)
+                    blits += 1
+        screen.set_clip(None)
+        metrics.count("blits", blits)
+        return regions
+
+
+def merge_rects(rects):
+    """
+    Merges overlapping rects into their unions so no pixel is repainted twice.
+    """
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -1,4 +1,5 @@
 # constants.py
+import os
 
 # Screen dimensions
 SCREEN_WIDTH = 800
@@ -13,6 +14,24 @@ BLUE = (0, 0, 255)
 
 # Game settings
 FPS = 60  # Frames per second
+DEBUG = False  # Print the dungeon layout to the console on every move
+UPDATE_RATE = 60  # Fixed game logic updates per second
+MAX_UPDATES_PER_FRAME = 5  # Logic updates run at most per frame before falling behind is accepted
+IDLE_TIMEOUT_MS = 250  # Longest a static state blocks waiting for an event
+INTRO_DURATION = 3  # Seconds the intro is shown
+LOADING_STEPS_PER_UPDATE = 16  # Steps of its preparation a loading screen runs per logic step, e.g. dungeon rows
+ASSET_CACHE_BUDGET = 96 * 1024 * 1024  # Bytes of decoded images kept by the asset cache
+TEXT_CACHE_BUDGET = 4 * 1024 * 1024  # Bytes of rendered text kept by the text cache
+ASSET_PACK_PATH = 'assets/assets.pack'  # Archive of pre-decoded assets built by 'python mightandmagic pack'
+SAVE_DIR = os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'mightandmagic', 'saves')  # Per-user directory games save to
+SAVE_NAME = 'quicksave.sav'  # Quick save written with F5 and loaded with F9
+AUTOSAVE_NAME = 'autosave.sav'  # Written while exploring, every AUTOSAVE_MOVES rooms entered
+AUTOSAVE_MOVES = 25  # Rooms entered between autosaves; 0 turns autosaving off
+POTION_HEAL = 25  # Health restored by consumables with the 'heal' effect
+METRICS_DUMP_INTERVAL = 10  # Seconds between dumps of the frame metrics when dumping is on
+STUTTER_MS = 2 * 1000 / FPS  # Frames taking longer than this are logged with their breakdown
+PRELOAD_WORKERS = 4  # Threads decoding assets in the background
+PRELOAD_FINALIZE_PER_FRAME = 4  # Preloaded assets converted on the main thread per frame
 
 #Intro images
 INTRO_BG_IMAGE_PATH = 'title.jpg'
@@ -23,6 +42,38 @@ OPTIONS_BUTTON_IMAGE_PATH = 'options.jpg'
 QUIT_BUTTON_IMAGE_PATH = 'exitbutton.jpg'
 MAIN_MENU_BG = 'menu.jpg'
 CHARACTER_SELECT_BG = 'characterselect.jpg'
+BUTTON_BG_IMAGE = 'buttonBG.jpg'
+MENU_BUTTON_SIZE = (180, 70)  # Size of the main menu and character selection buttons
+DIRECTION_BUTTON_SIZE = (100, 50)  # Size of the bottom UI's direction buttons
+DISABLED_BUTTON_TINT = (110, 110, 110)  # Multiplied into a disabled button's colours to dim it
+INPUT_GRID_CELL_SIZE = 100  # Width and height in pixels of the cells of the grid clicks are hit-tested in
+
+# Bottom UI
+BOTTOM_UI_PAPER_IMAGE = 'paper.jpg'
+BOTTOM_UI_HEIGHT = SCREEN_HEIGHT // 3
+
+# Room events, in the order of their codes in compact event grids
+EVENTS = ('trap', 'encounter', 'treasure', 'empty', 'npc', 'exit')
+EVENT_CODES = {event: code for code, event in enumerate(EVENTS)}
+
+# Relative weight of each event in generated dungeons
+DEFAULT_EVENT_WEIGHTS = {'trap': 1, 'encounter': 1, 'treasure': 1, 'empty': 1, 'npc': 1}
+GENERATION_CHUNK_SIZE = 64  # Width and height in rooms of the chunks dungeons are generated in
+MAX_LOADED_CHUNKS = 16  # Chunks a ChunkedDungeon keeps in memory
+DUNGEON_SIZE = 6  # Width and height in rooms of a new game's dungeon
+AUTO_WALK_AVOIDED_EVENTS = ('trap', 'encounter')  # Rooms auto-walk (A) paths around on its way to the exit
+AUTO_WALK_STEPS = UPDATE_RATE // 4  # Logic steps between the moves of an auto-walk
+CHUNKED_DUNGEON_SIZE = 64  # New games with dungeons at least this large generate rooms chunk by chunk as they are explored
+
+# Rooms kept alive by a compact dungeon after being looked at
+ROOM_VIEW_CACHE_SIZE = 64
+
+# Room background size on screen
+ROOM_IMAGE_SIZE = (800, 600)
+
+# Room description panel
+ROOM_PAPER_IMAGE = 'empty4.jpg'
+ROOM_DESCRIPTION_RECT = (250, 200, 300, 200)  # Position and size of the panel on screen
 
 # Room images
 ROOM_IMAGES = {
@@ -57,3 +108,31 @@ ROOM_IMAGES = {
     ],
     "exit": ["exit.jpg"],
 }
+
+# Minimap
+MINIMAP_SIZE = (160, 160)  # Width and height of the minimap in pixels
+MINIMAP_POS = (SCREEN_WIDTH - MINIMAP_SIZE[0] - 10, 10)  # Top left corner of the minimap on screen
+MINIMAP_CELL_SIZE = 16  # Width and height of a room on the minimap in pixels
+MINIMAP_MARGIN = 2  # The minimap scrolls when the player comes this many rooms from its edge
+MINIMAP_FOG_COLOR = (0, 0, 0)  # Rooms not revealed yet
+MINIMAP_REVEALED_COLOR = (70, 70, 70)  # Rooms next to a visited room
+MINIMAP_PLAYER_COLOR = (255, 255, 255)
+MINIMAP_COLORS = {
+    'trap': (170, 40, 40),
+    'encounter': (200, 120, 30),
+    'treasure': (220, 200, 40),
+    'empty': (130, 120, 105),
+    'npc': (60, 120, 200),
+    'exit': (40, 170, 60),
+}  # Visited rooms by event
+
+# Map view
+VIEWPORT_TILE_SIZE = 64  # Width and height of a room on the map view in pixels
+VIEWPORT_CHUNK_TILES = 8  # Width and height in rooms of the map chunks drawn and cached as one surface
+VIEWPORT_MAX_CHUNKS = 64  # Chunk surfaces kept before the least recently drawn is dropped
+CAMERA_SMOOTHING = 0.2  # Fraction of the distance to its target the map view's camera moves every logic step
+
+# Simulation rules used by simulation.py
+SIMULATION_DAMAGE = {"trap": (5, 20), "encounter": (10, 30)}  # Damage range dealt by each event
+SIMULATION_TREASURE_GOLD = (10, 50)  # Gold range found in a treasure room
+SIMULATION_MAX_STEPS_PER_ROOM = 4  # A run gives up after this many moves per room of the dungeon
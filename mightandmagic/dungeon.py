@@ -1,4 +1,15 @@
 import random
+from collections import OrderedDict
+
+from constants import (
+    CHUNKED_DUNGEON_SIZE,
+    EVENT_CODES,
+    EVENTS,
+    GENERATION_CHUNK_SIZE,
+    MAX_LOADED_CHUNKS,
+    ROOM_VIEW_CACHE_SIZE,
+)
+from generation import chunk_bounds, generate_chunk, generate_events
 from room import Room
 
 class Dungeon:
@@ -6,16 +17,21 @@ class Dungeon:
     The Dungeon class represents the entire dungeon.
     Each dungeon is a square grid of rooms, with the size provided upon initialization.
     """
-    def __init__(self, size):
+    listeners = ()  # Callbacks told about rooms whose event changed, see add_listener
+
+    def __init__(self, size, generate=True):
         """
         Initialize a new Dungeon instance.
 
         Args:
             size (int): The width and height of the dungeon in rooms.
+            generate (bool): Whether to generate the rooms right away. If False, the caller generates them,
+                e.g. step by step with iter_generate_rooms.
         """
         self.size = size
         self.rooms = [[None for _ in range(size)] for _ in range(size)]
-        self.generate_rooms()
+        if generate:
+            self.generate_rooms()
 
     def generate_rooms(self):
         """
@@ -23,14 +39,46 @@ class Dungeon:
         Each room is assigned a description, an event, and directions to adjacent rooms.
         The bottom right room is always set as the 'exit'.
         """
+        for _ in self.iter_generate_rooms():
+            pass
+
+    def iter_generate_rooms(self):
+        """
+        Generate the rooms in the dungeon one row at a time, yielding the fraction of rows done after each row.
+        """
         for i in range(self.size):
             for j in range(self.size):
                 description = 'This is a room.'
                 event = self.select_event(i, j)
                 directions = self.generate_directions(i, j)
                 self.rooms[i][j] = Room(description, event, directions)
-        # Make the bottom right room an 'exit'
-        self.rooms[-1][-1].event = 'exit'
+            if i == self.size - 1:
+                # Make the bottom right room an 'exit'
+                self.rooms[-1][-1].event = 'exit'
+            yield (i + 1) / self.size
+
+    def load_events(self, events):
+        """
+        Rebuild the rooms from the event codes of every room, row by row, e.g. those of a saved game.
+        """
+        for i in range(self.size):
+            for j in range(self.size):
+                event = EVENTS[events[i * self.size + j]]
+                self.rooms[i][j] = Room('This is a room.', event, self.generate_directions(i, j))
+
+    def add_listener(self, callback):
+        """
+        Calls callback(i, j) whenever set_event changes the event of the room at row i, column j.
+        """
+        self.listeners = self.listeners + (callback,)
+
+    def set_event(self, i, j, event):
+        """
+        Sets the event of the room at row i, column j.
+        """
+        self.rooms[i][j].event = event
+        for listener in self.listeners:
+            listener(i, j)
 
     def select_event(self, i, j):
         """
@@ -69,6 +117,25 @@ class Dungeon:
         if j < self.size - 1: directions['east'] = (i, j+1)
         return directions
 
+    def event_at(self, i, j):
+        """
+        Returns the event of the room at row i, column j.
+        """
+        return self.rooms[i][j].event
+
+    def event_grid(self):
+        """
+        Returns the events of every room as a bytearray of event codes, row by row.
+        """
+        return bytearray(EVENT_CODES[room.event] for row in self.rooms for room in row)
+
+    def visit(self, i, j):
+        """
+        Called when the player enters the room at row i, column j.
+        Every room of this dungeon is built up front, so there is nothing to prepare.
+        """
+        pass
+
     def print_dungeon(self):
         """
         Print the layout of the dungeon in the command line.
@@ -78,3 +145,314 @@ class Dungeon:
             for j in range(self.size):
                 print(self.rooms[i][j].event[0].upper(), end=' ')
             print()
+
+
+class CompactDungeon(Dungeon):
+    """
+    A dungeon stored as a grid of one-byte event codes, for dungeons too large to keep a Room per cell.
+    Neighbours are derived from the coordinates, and Room objects are only created when a room is looked at.
+    """
+    description = 'This is a room.'  # The description shared by every room
+
+    def __init__(self, size, events=None, seed=None, weights=None, chunk_size=None):
+        """
+        Initialize a new CompactDungeon instance.
+
+        Args:
+            size (int): The width and height of the dungeon in rooms.
+            events (bytes, optional): Event codes of every room, row by row. Generated if not given.
+            seed (int, optional): The seed the events are generated from. Drawn from the random module if not given,
+                so seeding the random module still makes the dungeon reproducible.
+            weights (dict, optional): Relative weight of each event. Defaults to DEFAULT_EVENT_WEIGHTS.
+            chunk_size (int, optional): Generate the events chunk by chunk, see generation.generate_events.
+        """
+        self.size = size
+        self.seed = seed  # The seed the events were generated from, None if they were given
+        if events is None:
+            if self.seed is None:
+                self.seed = random.getrandbits(32)
+            events = generate_events(size, self.seed, weights, chunk_size)
+        self.events = bytearray(events)  # One event code per room
+        if len(self.events) != size * size:
+            raise ValueError(f"Expected {size * size} event codes, got {len(self.events)}.")
+        self.rooms = RoomGrid(self)  # Supports rooms[i][j] like a Dungeon's list of lists
+        self.views = OrderedDict()  # Recently looked at rooms, so they keep their image and description
+
+    def generate_rooms(self):
+        """
+        Regenerate the events of the rooms in the dungeon with one select_event call per room.
+        This is the reference implementation the vectorized generation in generation.py replaces.
+        The bottom right room is always set as the 'exit'.
+        """
+        events = self.events
+        for i in range(self.size):
+            row = i * self.size
+            for j in range(self.size):
+                events[row + j] = EVENT_CODES[self.select_event(i, j)]
+        events[-1] = EVENT_CODES['exit']
+
+    def event_at(self, i, j):
+        """
+        Returns the event of the room at row i, column j.
+        """
+        return EVENTS[self.events[i * self.size + j]]
+
+    def set_event(self, i, j, event):
+        """
+        Sets the event of the room at row i, column j.
+        """
+        self.events[i * self.size + j] = EVENT_CODES[event]
+        view = self.views.get((i, j))
+        if view is not None:
+            view._image = None  # The image belongs to the old event
+        for listener in self.listeners:
+            listener(i, j)
+
+    def event_grid(self):
+        """
+        Returns the event codes of every room, row by row. This is the dungeon's own storage, not a copy.
+        """
+        return self.events
+
+    def room_at(self, i, j):
+        """
+        Returns the room at row i, column j, creating a view of it if it was not looked at recently.
+        """
+        key = (i, j)
+        view = self.views.get(key)
+        if view is None:
+            view = GridRoom(self, i, j)
+            self.views[key] = view
+            if len(self.views) > ROOM_VIEW_CACHE_SIZE:
+                self.views.popitem(last=False)
+        else:
+            self.views.move_to_end(key)
+        return view
+
+    def print_dungeon(self):
+        """
+        Print the layout of the dungeon in the command line.
+        Each room is represented by the first letter of its event, in uppercase.
+        """
+        letters = [event[0].upper() for event in EVENTS]
+        events = self.event_grid()
+        for i in range(self.size):
+            row = events[i * self.size:(i + 1) * self.size]
+            print(''.join(letters[code] + ' ' for code in row))
+
+
+class ChunkedDungeon(CompactDungeon):
+    """
+    A dungeon whose rooms are generated chunk by chunk as the player reaches them.
+    Each chunk is generated deterministically from the world seed and its coordinates, only the most recently
+    visited chunks are kept in memory, and an evicted chunk is regenerated identically when it is needed again.
+    Startup time and memory therefore do not depend on the size of the dungeon.
+    """
+    chunked = True  # Whole-grid tools such as NavigationIndex refuse chunked dungeons
+    def __init__(self, size, seed=None, weights=None, chunk_size=GENERATION_CHUNK_SIZE, max_chunks=MAX_LOADED_CHUNKS):
+        """
+        Initialize a new ChunkedDungeon instance. No rooms are generated until they are visited or looked at.
+
+        Args:
+            size (int): The width and height of the dungeon in rooms.
+            seed (int, optional): The world seed. Drawn from the random module if not given.
+            weights (dict, optional): Relative weight of each event. Defaults to DEFAULT_EVENT_WEIGHTS.
+            chunk_size (int): The width and height of a chunk in rooms.
+            max_chunks (int): The number of chunks kept in memory before the least recently visited is evicted.
+        """
+        self.size = size
+        self.seed = random.getrandbits(32) if seed is None else seed  # The world seed
+        self.weights = weights
+        self.chunk_size = chunk_size
+        self.max_chunks = max(max_chunks, 9)  # A room and all its neighbours must fit
+        self.chunks = OrderedDict()  # Event codes of loaded chunks, least recently visited first
+        self.overrides = {}  # Event codes of rooms changed after generation by chunk, then index within the chunk
+        self.rooms = RoomGrid(self)
+        self.views = OrderedDict()
+
+    def generate_rooms(self):
+        """
+        Discard every loaded chunk and change, so rooms are generated afresh from the world seed.
+        """
+        self.chunks.clear()
+        self.overrides.clear()
+        self.views.clear()
+
+    def chunk_of(self, i, j):
+        """
+        Returns the coordinates of the chunk holding the room at row i, column j.
+        """
+        return i // self.chunk_size, j // self.chunk_size
+
+    def load_chunk(self, chunk):
+        """
+        Returns the event codes of a chunk, generating it if it is not loaded and evicting the least recently
+        visited chunks beyond max_chunks.
+        """
+        events = self.chunks.get(chunk)
+        if events is None:
+            events = generate_chunk(self.seed, *chunk, self.size, self.weights, self.chunk_size)
+            for index, code in self.overrides.get(chunk, {}).items():
+                events[index] = code
+            self.chunks[chunk] = events
+            while len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        return events
+
+    def visit(self, i, j):
+        """
+        Called when the player enters the room at row i, column j.
+        Loads the room's chunk and the chunks of its neighbours and marks them as the most recently visited.
+        """
+        chunks = {self.chunk_of(i, j)}
+        chunks.update(self.chunk_of(*position) for position in self.generate_directions(i, j).values())
+        for chunk in chunks:
+            self.load_chunk(chunk)
+            self.chunks.move_to_end(chunk)
+
+    def cell_index(self, i, j):
+        """
+        Returns the chunk holding the room at row i, column j and the room's index within it.
+        """
+        chunk = self.chunk_of(i, j)
+        ci, cj, _, cols = chunk_bounds(*chunk, self.chunk_size, self.size)
+        return chunk, (i - ci) * cols + (j - cj)
+
+    def event_at(self, i, j):
+        """
+        Returns the event of the room at row i, column j, generating its chunk if needed.
+        """
+        chunk, index = self.cell_index(i, j)
+        return EVENTS[self.load_chunk(chunk)[index]]
+
+    def set_event(self, i, j, event):
+        """
+        Sets the event of the room at row i, column j. The change survives the chunk being evicted,
+        and a chunk that is not loaded is not generated for it.
+        """
+        chunk, index = self.cell_index(i, j)
+        code = EVENT_CODES[event]
+        events = self.chunks.get(chunk)
+        if events is not None:
+            events[index] = code
+        self.overrides.setdefault(chunk, {})[index] = code
+        view = self.views.get((i, j))
+        if view is not None:
+            view._image = None
+        for listener in self.listeners:
+            listener(i, j)
+
+    def event_grid(self):
+        """
+        Returns the event codes of every room, row by row, as a new bytearray.
+        This generates the whole dungeon, so it is only meant for small dungeons and tools.
+        """
+        events = generate_events(self.size, self.seed, self.weights, self.chunk_size)
+        for i, j, code in self.iter_overrides():
+            events[i * self.size + j] = code
+        return events
+
+    def iter_overrides(self):
+        """
+        Yields the row, column and event code of every room changed after generation.
+        """
+        for chunk, changes in self.overrides.items():
+            ci, cj, _, cols = chunk_bounds(*chunk, self.chunk_size, self.size)
+            for index, code in changes.items():
+                yield ci + index // cols, cj + index % cols, code
+
+
+class RoomGrid:
+    """
+    A read-only view of a compact dungeon's rooms that can be indexed as rooms[i][j].
+    """
+    def __init__(self, dungeon):
+        self.dungeon = dungeon
+
+    def __len__(self):
+        return self.dungeon.size
+
+    def __getitem__(self, i):
+        return RoomRow(self.dungeon, _check_index(i, self.dungeon.size))
+
+    def __iter__(self):
+        for i in range(self.dungeon.size):
+            yield RoomRow(self.dungeon, i)
+
+
+class RoomRow:
+    """
+    A read-only view of one row of a compact dungeon's rooms.
+    """
+    def __init__(self, dungeon, i):
+        self.dungeon = dungeon
+        self.i = i
+
+    def __len__(self):
+        return self.dungeon.size
+
+    def __getitem__(self, j):
+        return self.dungeon.room_at(self.i, _check_index(j, self.dungeon.size))
+
+    def __iter__(self):
+        for j in range(self.dungeon.size):
+            yield self.dungeon.room_at(self.i, j)
+
+
+def _check_index(index, size):
+    """
+    Resolves a negative index and raises IndexError if the index is out of range.
+    """
+    if index < 0:
+        index += size
+    if not 0 <= index < size:
+        raise IndexError("dungeon index out of range")
+    return index
+
+
+class GridRoom(Room):
+    """
+    A flyweight room of a compact dungeon. Its event lives in the dungeon's event grid and its directions are
+    derived from its position, so the view itself only holds its position, description and image.
+    """
+    def __init__(self, dungeon, i, j):
+        """
+        Initializes a view of the room at row i, column j of the dungeon.
+        """
+        self.dungeon = dungeon  # The dungeon holding the room's event
+        self.position = (i, j)  # The room's row and column
+        self.description = dungeon.description  # The room's description
+        self._image = None
+
+    @property
+    def event(self):
+        """
+        The room's event, stored in the dungeon's event grid.
+        """
+        return self.dungeon.event_at(*self.position)
+
+    @event.setter
+    def event(self, event):
+        self.dungeon.set_event(*self.position, event)
+        self._image = None
+
+    @property
+    def directions(self):
+        """
+        The coordinates of the adjacent rooms, derived from the room's position.
+        """
+        return self.dungeon.generate_directions(*self.position)
+
+
+def new_dungeon(size, generate=True):
+    """
+    Returns the dungeon of a new game: a Dungeon of rooms, or from CHUNKED_DUNGEON_SIZE rooms on a ChunkedDungeon,
+    whose rooms are only generated when the player moves into or next to their chunk.
+
+    Args:
+        size (int): The width and height of the dungeon in rooms.
+        generate (bool): Whether to generate the rooms of a Dungeon right away, see Dungeon.
+    """
+    if size >= CHUNKED_DUNGEON_SIZE:
+        return ChunkedDungeon(size)
+    return Dungeon(size, generate)
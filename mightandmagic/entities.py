@@ -0,0 +1,151 @@
+"""
+Struct-of-arrays storage for large numbers of players.
+A PlayerStore keeps each attribute in its own typed column instead of one object per player, so a simulation can
+hold hundreds of thousands of players in a few bytes each and hand whole columns to combat.py.
+"""
+from array import array
+
+from player import Player
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; columns() then returns the arrays themselves
+    np = None
+
+NUMERIC_ATTRIBUTES = ('health', 'defense', 'dodge', 'level', 'exp')  # Attributes stored in 32-bit int columns
+
+
+class PlayerStore:
+    """
+    Players stored column by column. Player number k is row k of every column.
+    """
+    def __init__(self):
+        """
+        Initializes an empty store.
+        """
+        self.names = []  # The players' names
+        self.weapons = []  # The players' weapons, None if unarmed
+        self.health = array('i')  # The players' health
+        self.defense = array('i')  # The players' defense
+        self.dodge = array('i')  # The players' dodge
+        self.level = array('i')  # The players' level
+        self.exp = array('i')  # The players' experience
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("player index out of range")
+        return PlayerHandle(self, index % len(self))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PlayerHandle(self, index)
+
+    def add(self, name, health, defense, dodge, level=1, exp=0, weapon=None):
+        """
+        Adds a player and returns a handle to it.
+        Raises BufferError, leaving the store unchanged, while a view returned by columns() is alive.
+        """
+        self.extend_columns(((self.health, health), (self.defense, defense), (self.dodge, dodge),
+                             (self.level, level), (self.exp, exp)), 1)
+        self.names.append(name)
+        self.weapons.append(weapon)
+        return PlayerHandle(self, len(self.names) - 1)
+
+    def add_player(self, player):
+        """
+        Copies the attributes of a Player into the store and returns a handle to it.
+        The player's inventory and class-specific attributes are not stored.
+        """
+        return self.add(player.name, player.health, player.defense, player.dodge, player.level, player.exp,
+                        player.weapon)
+
+    def add_many(self, count, name, health, defense, dodge):
+        """
+        Adds count players with the same attributes, extending each column at once.
+        Raises BufferError, leaving the store unchanged, while a view returned by columns() is alive.
+        """
+        self.extend_columns(((self.health, health), (self.defense, defense), (self.dodge, dodge),
+                             (self.level, 1), (self.exp, 0)), count)
+        self.names.extend([name] * count)
+        self.weapons.extend([None] * count)
+
+    def extend_columns(self, values, count):
+        """
+        Appends count copies of each value to its numeric column, given as (column, value) pairs.
+        An array cannot grow while its memory is exported, so if one column refuses, the columns already extended
+        are shrunk back before the BufferError is raised again.
+        """
+        extended = []
+        try:
+            for column, value in values:
+                column.extend(array('i', [value]) * count)
+                extended.append(column)
+        except BufferError:
+            for column in extended:
+                del column[len(column) - count:]
+            raise
+
+    def columns(self, *names):
+        """
+        Returns the named numeric columns, as NumPy arrays sharing the store's memory when NumPy is installed.
+        Writing to them writes to the store. While any of them is alive, adding players raises BufferError,
+        so drop them before adding more.
+        """
+        if np is None:
+            return tuple(getattr(self, name) for name in names)
+        return tuple(np.frombuffer(getattr(self, name), dtype=np.int32) for name in names)
+
+    def nbytes(self):
+        """
+        Returns the bytes used by the numeric columns and the name and weapon lists, not counting the names
+        themselves, which are usually shared.
+        """
+        columns = sum(getattr(self, name).itemsize * len(self) for name in NUMERIC_ATTRIBUTES)
+        return columns + (self.names.__sizeof__() + self.weapons.__sizeof__())
+
+
+class PlayerHandle:
+    """
+    A view of one player in a PlayerStore with the attributes of a Player.
+    Handles are created on demand and hold no state of their own.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store  # The store holding the player
+        self.index = index  # The player's row in the store
+
+    @property
+    def name(self):
+        return self.store.names[self.index]
+
+    @property
+    def weapon(self):
+        return self.store.weapons[self.index]
+
+    @weapon.setter
+    def weapon(self, weapon):
+        self.store.weapons[self.index] = weapon
+
+    take_damage = Player.take_damage
+    dodge_attack = Player.dodge_attack
+
+
+def _column_property(name):
+    """
+    Returns a property reading and writing the handle's row of the named column.
+    """
+    def get(handle):
+        return getattr(handle.store, name)[handle.index]
+
+    def set(handle, value):
+        getattr(handle.store, name)[handle.index] = value
+
+    return property(get, set, doc=f"The player's {name}.")
+
+
+for _name in NUMERIC_ATTRIBUTES:
+    setattr(PlayerHandle, _name, _column_property(_name))
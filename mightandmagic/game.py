@@ -1,8 +1,12 @@
 # Import necessary modules
 import pygame
-from constants import INTRO_BG_IMAGE_PATH
+from asset_pack import open_pack
+from cache import asset_cache
+from constants import FPS, IDLE_TIMEOUT_MS, MAX_UPDATES_PER_FRAME, PRELOAD_FINALIZE_PER_FRAME, UPDATE_RATE
+from input_router import allow_routed_events
+from metrics import metrics
+from preloader import start_preloading
 from states import IntroState
-from utils import image_loader
 
 class MightAndMagic:
     def __init__(self):
@@ -12,18 +16,64 @@ class MightAndMagic:
         """
         self._init_pygame()
         self.screen = pygame.display.set_mode((800,800))  # Create a display surface
-        self.background = image_loader(INTRO_BG_IMAGE_PATH,folder="backgrounds", with_alpha=False, scale=True)  # Load the background image
+        allow_routed_events()  # Keep events no state handles out of the queue
+        open_pack(asset_cache)  # Use pre-decoded assets if the asset pack was built
+        start_preloading()  # Decode the game's assets in the background while the intro is shown
         self.state = IntroState(self.screen)  # Set the initial game state
+        self.recorder = None  # Records the input of every frame when set, see replay.py
 
     def main_loop(self):
         """
         Main game loop which will run indefinitely.
-        Handles user input, processes game logic, and draws the current state of the game to the screen.
+        Game logic advances in fixed steps of 1 / UPDATE_RATE seconds, rendering is capped at FPS,
+        and while the current state is static the loop blocks on the event queue instead of spinning.
         """
+        clock = pygame.time.Clock()
+        step_ms = 1000 / UPDATE_RATE  # Duration of one logic step in milliseconds
+        lag = 0.0  # Time not yet consumed by logic steps
         while True:
-            self._handle_input()  # Handle user input
+            elapsed = clock.tick(FPS)  # Cap the frame rate
+            if self.state.is_static():
+                events = self._wait_for_events()
+            else:
+                events = pygame.event.get()
+            lag = min(lag + elapsed, step_ms * MAX_UPDATES_PER_FRAME)  # Drop time we cannot catch up on
+            steps = int(lag // step_ms)
+            lag -= steps * step_ms
+            self._step(events, steps)
+
+    def _step(self, events, steps):
+        """
+        Runs one frame: handles the given events, runs the given number of logic steps and draws.
+        While metrics are enabled each phase is timed, see metrics.py.
+        """
+        if self.recorder is not None:
+            self.recorder.record(events, steps)
+        timed = metrics.enabled
+        if timed:
+            metrics.begin_frame(self.state)
+        if asset_cache.pending:
+            asset_cache.poll(PRELOAD_FINALIZE_PER_FRAME)  # Convert assets decoded in the background
+        self._handle_input(events)  # Handle user input
+        if timed:
+            metrics.lap("input", self.state)
+        for _ in range(steps):
             self._process_game_logic()  # Process game logic
-            self._draw()  # Draw the current state of the game to the screen
+        if timed:
+            metrics.lap("logic", self.state)
+        self._draw()  # Draw the current state of the game to the screen
+        if timed:
+            metrics.lap("draw", self.state)
+            metrics.end_frame()
+
+    def _wait_for_events(self):
+        """
+        Blocks until an event arrives or IDLE_TIMEOUT_MS passes, then returns every pending event.
+        """
+        event = pygame.event.wait(IDLE_TIMEOUT_MS)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
 
     def _init_pygame(self):
         """
@@ -32,16 +82,23 @@ class MightAndMagic:
         pygame.init()
         pygame.display.set_caption("Might and Magic v0.1")
 
-    def _handle_input(self):
+    def _handle_input(self, events=None):
         """
         Handle user input.
-        Iterates over each event in the pygame event queue.
+        Iterates over the given events, or over each event in the pygame event queue if none are given.
         If the event type is QUIT, then it exits the game.
         Otherwise, it updates the current state based on user input.
         """
-        for event in pygame.event.get():
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 quit()
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.state.invalidate()  # The window contents were lost, repaint everything
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                metrics.toggle_overlay()
+                self.state.invalidate()  # Repaint what the overlay covered
             new_state = self.state.handle_input(event)
             if new_state is not None:
                 self.state = new_state
@@ -58,9 +115,22 @@ class MightAndMagic:
     def _draw(self):
         """
         Draw the current state of the game to the screen.
-        Blits the background image to the screen, draws the current state, and updates the display surface.
+        Draws the current state and presents only the regions it reports as changed,
+        or the full display surface if it does not report any. The metrics overlay is drawn on top when shown;
+        where it shrank since the last frame, the state repaints the scene.
         """
-        self.screen.blit(self.background, (0, 0))
-        self.state.draw(self.screen)
-        pygame.display.flip()  # Update the full display surface to the screen
+        overlay = metrics.render_overlay() if metrics.overlay else None
+        if overlay is not None:
+            uncovered = metrics.uncovered_area(overlay)
+            if uncovered is not None:
+                self.state.invalidate(uncovered)
+        dirty = self.state.draw(self.screen)
+        if overlay is not None:
+            area = metrics.draw_overlay(self.screen, overlay)
+            if dirty is not None:
+                dirty = list(dirty) + [area]
+        if dirty is None:
+            pygame.display.flip()  # Update the full display surface to the screen
+        elif dirty:
+            pygame.display.update(dirty)  # Update only the regions that changed
 
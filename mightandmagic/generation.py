@@ -0,0 +1,142 @@
+import bisect
+import hashlib
+from itertools import accumulate
+
+from constants import DEFAULT_EVENT_WEIGHTS, EVENT_CODES, GENERATION_CHUNK_SIZE
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; generation falls back to the standard library
+    np = None
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15  # Step between the counters of a stream, as in SplitMix64
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+
+
+def derive_seed(seed, *parts):
+    """
+    Derives a 64-bit seed from a seed and any number of integers, e.g. chunk coordinates.
+    The result does not depend on the process, so derived streams are reproducible between runs.
+    """
+    text = ":".join(str(part) for part in (seed,) + parts)
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def uniform_stream(seed, count):
+    """
+    Returns count numbers in [0, 1) drawn from a stream seeded with seed.
+    Number k is the SplitMix64 hash of seed + (k + 1) * GOLDEN_GAMMA, keeping the top 53 bits. Every number is
+    computed independently with exact 64-bit integer arithmetic, so NumPy computes the whole stream in one
+    vectorized pass and the plain Python fallback yields the very same numbers.
+    Returns a NumPy array when NumPy is installed and a list otherwise.
+    """
+    seed &= MASK64
+    if np is not None:
+        x = np.arange(1, count + 1, dtype=np.uint64) * np.uint64(GOLDEN_GAMMA) + np.uint64(seed)  # Wraps modulo 2**64
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(MIX_1)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(MIX_2)
+        x ^= x >> np.uint64(31)
+        return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+    numbers = []
+    for k in range(1, count + 1):
+        x = (seed + k * GOLDEN_GAMMA) & MASK64
+        x = ((x ^ (x >> 30)) * MIX_1) & MASK64
+        x = ((x ^ (x >> 27)) * MIX_2) & MASK64
+        numbers.append(((x ^ (x >> 31)) >> 11) * 2.0 ** -53)
+    return numbers
+
+
+def event_table(weights=None):
+    """
+    Returns the event codes and cumulative weights of an event weight table.
+
+    Args:
+        weights (dict, optional): Relative weight of each event. Defaults to DEFAULT_EVENT_WEIGHTS.
+    """
+    weights = DEFAULT_EVENT_WEIGHTS if weights is None else weights
+    unknown = [event for event in weights if event not in EVENT_CODES]
+    if unknown:
+        raise ValueError(f"Unknown event(s) in weight table: {', '.join(unknown)}")
+    if not weights or any(weight < 0 for weight in weights.values()) or sum(weights.values()) <= 0:
+        raise ValueError("Event weights must be non-negative and not all zero.")
+    codes = [EVENT_CODES[event] for event in weights]
+    return codes, list(accumulate(weights.values()))
+
+
+def fill_events(seed, count, weights=None):
+    """
+    Draws count event codes from the weight table in a single pass and returns them as a bytearray.
+    The codes are picked with numbers from uniform_stream, so the same seed gives the same events
+    whether or not NumPy is installed.
+    """
+    codes, cumulative = event_table(weights)
+    total = cumulative[-1]
+    last = cumulative.index(total)  # The last event with a weight, in case rounding lands on the total
+    if np is not None:
+        picks = np.searchsorted(np.asarray(cumulative, dtype=np.float64), uniform_stream(seed, count) * total, "right")
+        return bytearray(np.asarray(codes, dtype=np.uint8)[np.minimum(picks, last)].tobytes())
+    return bytearray(
+        codes[min(bisect.bisect_right(cumulative, number * total), last)] for number in uniform_stream(seed, count)
+    )
+
+
+def chunk_bounds(chunk_row, chunk_col, chunk_size, size):
+    """
+    Returns the first row, first column, height and width of a chunk, clipped to the dungeon.
+    """
+    i = chunk_row * chunk_size
+    j = chunk_col * chunk_size
+    return i, j, min(chunk_size, size - i), min(chunk_size, size - j)
+
+
+def generate_chunk(seed, chunk_row, chunk_col, size, weights=None, chunk_size=GENERATION_CHUNK_SIZE):
+    """
+    Generates the event codes of one square chunk of a dungeon, row by row.
+    Each chunk is drawn from its own stream derived from the seed and the chunk's coordinates,
+    so chunks can be generated in any order and always come out the same.
+    The bottom right room of the dungeon is always set as the 'exit'.
+    """
+    i, j, rows, cols = chunk_bounds(chunk_row, chunk_col, chunk_size, size)
+    events = fill_events(derive_seed(seed, chunk_row, chunk_col), rows * cols, weights)
+    if i + rows == size and j + cols == size:
+        events[-1] = EVENT_CODES['exit']
+    return events
+
+
+def iter_chunks(size, seed, weights=None, chunk_size=GENERATION_CHUNK_SIZE):
+    """
+    Generates a dungeon incrementally, yielding (chunk_row, chunk_col, events) for every chunk.
+    """
+    chunks = -(-size // chunk_size)
+    for chunk_row in range(chunks):
+        for chunk_col in range(chunks):
+            yield chunk_row, chunk_col, generate_chunk(seed, chunk_row, chunk_col, size, weights, chunk_size)
+
+
+def generate_events(size, seed, weights=None, chunk_size=None):
+    """
+    Generates the event codes of every room of a size x size dungeon, row by row.
+
+    Args:
+        size (int): The width and height of the dungeon in rooms.
+        seed (int): The seed the events are drawn from.
+        weights (dict, optional): Relative weight of each event. Defaults to DEFAULT_EVENT_WEIGHTS.
+        chunk_size (int, optional): If given, the dungeon is assembled from chunks of this size, exactly as
+            iter_chunks and generate_chunk produce them. Otherwise the whole grid is drawn in one pass.
+
+    Returns:
+        bytearray: One event code per room. The bottom right room is always the 'exit'.
+    """
+    if chunk_size is None:
+        events = fill_events(derive_seed(seed), size * size, weights)
+        events[-1] = EVENT_CODES['exit']
+        return events
+    events = bytearray(size * size)
+    for chunk_row, chunk_col, chunk in iter_chunks(size, seed, weights, chunk_size):
+        i, j, rows, cols = chunk_bounds(chunk_row, chunk_col, chunk_size, size)
+        for row in range(rows):
+            start = (i + row) * size + j
+            events[start:start + cols] = chunk[row * cols:(row + 1) * cols]
+    return events
@@ -0,0 +1,94 @@
+import pygame
+
+from constants import INPUT_GRID_CELL_SIZE
+
+ROUTED_EVENTS = (
+    pygame.QUIT,
+    pygame.KEYDOWN,
+    pygame.MOUSEBUTTONDOWN,
+    pygame.VIDEOEXPOSE,
+    pygame.WINDOWEXPOSED,
+)  # The only events the game handles; every other event is kept out of the queue
+
+
+def allow_routed_events():
+    """
+    Blocks every event type the game does not handle, so mouse motion and the like never reach the event queue.
+    """
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(list(ROUTED_EVENTS))
+
+
+class InputRouter:
+    """
+    Dispatches a state's input to callbacks.
+    Clicks are hit-tested against the widgets registered with add() through a uniform grid over the screen,
+    so a click only checks the few widgets overlapping its grid cell however many widgets there are.
+    Key presses are looked up in a table of key bindings.
+    """
+    def __init__(self, cell_size=INPUT_GRID_CELL_SIZE):
+        """
+        Initializes a router without widgets or key bindings.
+        """
+        self.cell_size = cell_size  # Width and height in pixels of a grid cell
+        self.cells = {}  # Widgets overlapping each grid cell, by (column, row), in the order they were added
+        self.widgets = {}  # The callback and grid cells of every widget
+        self.keys = {}  # Callbacks by key
+
+    def add(self, widget, callback=None):
+        """
+        Registers a widget with a rect. A click inside the rect calls callback(), or widget.callback() if no callback
+        is given. Widgets added later are hit first where widgets overlap.
+        """
+        self.remove(widget)
+        rect = widget.rect
+        first_column, first_row = rect.left // self.cell_size, rect.top // self.cell_size
+        last_column, last_row = (rect.right - 1) // self.cell_size, (rect.bottom - 1) // self.cell_size
+        cells = [(column, row) for column in range(first_column, last_column + 1) for row in range(first_row, last_row + 1)]
+        for cell in cells:
+            self.cells.setdefault(cell, []).append(widget)
+        self.widgets[widget] = (callback if callback is not None else widget.callback, cells)
+
+    def remove(self, widget):
+        """
+        Unregisters a widget if it is registered.
+        """
+        entry = self.widgets.pop(widget, None)
+        if entry is None:
+            return
+        for cell in entry[1]:
+            widgets = self.cells[cell]
+            widgets.remove(widget)
+            if not widgets:
+                del self.cells[cell]
+
+    def bind_key(self, key, callback):
+        """
+        Calls callback() when the key is pressed.
+        """
+        self.keys[key] = callback
+
+    def hit(self, pos):
+        """
+        Returns the topmost enabled widget at pos, or None.
+        """
+        x, y = pos
+        for widget in reversed(self.cells.get((x // self.cell_size, y // self.cell_size), ())):
+            if widget.rect.collidepoint(x, y) and getattr(widget, "enabled", True):
+                return widget
+        return None
+
+    def dispatch(self, event):
+        """
+        Calls the callback of the widget clicked or the key pressed by the event and returns its result,
+        e.g. the state to switch to. Returns None for any other event.
+        """
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            widget = self.hit(event.pos)
+            if widget is not None:
+                return self.widgets[widget][0]()
+        elif event.type == pygame.KEYDOWN:
+            callback = self.keys.get(event.key)
+            if callback is not None:
+                return callback()
+        return None
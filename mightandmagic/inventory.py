@@ -1,7 +1,35 @@
+from constants import POTION_HEAL
+
+EFFECTS = {}  # Consumable effects by name, so saved consumables are restored with their effect
+
+
+def register_effect(name):
+    """
+    Decorator registering a function taking a player as the consumable effect of the given name.
+    Only consumables with a registered effect can be saved.
+    """
+    def register(effect):
+        EFFECTS[name] = effect
+        effect.effect_name = name
+        return effect
+    return register
+
+
+@register_effect('heal')
+def heal(player):
+    """
+    Restores POTION_HEAL health to the player.
+    """
+    player.health += POTION_HEAL
+
+
 class Item:
     """
     The Item class is an abstract representation of an item in the game.
+    Items use __slots__ to keep large inventories small.
     """
+    __slots__ = ('name', 'description', 'type')
+
     def __init__(self, name, description, item_type):
         """
         The constructor initializes the item's attributes.
@@ -14,6 +42,8 @@ class Weapon(Item):
     """
     The Weapon class is a specific type of item that adds damage to player's attacks.
     """
+    __slots__ = ('damage',)
+
     def __init__(self, name, description, damage):
         """
         The constructor initializes the weapon's attributes.
@@ -25,17 +55,21 @@ class Consumable(Item):
     """
     The Consumable class is a specific type of item that has an effect when used.
     """
+    __slots__ = ('effect',)
+
     def __init__(self, name, description, effect):
         """
         The constructor initializes the consumable's attributes.
         """
         super().__init__(name, description, 'consumable')
-        self.effect = effect  # The consumable's effect
+        self.effect = effect  # The consumable's effect, a function taking the player, see register_effect
 
 class Gold(Item):
     """
     The Gold class is a specific type of item used for transactions.
     """
+    __slots__ = ('amount',)
+
     def __init__(self, amount):
         """
         The constructor initializes the gold's attributes.
@@ -46,37 +80,121 @@ class Gold(Item):
 class Inventory:
     """
     The Inventory class holds player's items.
+    Items are indexed by type and name, and gold is kept as a running total instead of as separate items,
+    so lookups and aggregate queries never scan the inventory.
     """
+    __slots__ = ('items', 'instances', 'type_counts', 'size', 'gold')
+
     def __init__(self):
         """
         The constructor initializes the inventory's attributes.
         """
-        self.items = {}  # The inventory's items
+        self.items = {}  # The inventory's item counts by name, with the gold total under 'Gold'
+        self.instances = {}  # Items other than gold by type, then name; filled as items are added
+        self.type_counts = {}  # The number of items of each type other than gold
+        self.size = 0  # The number of items other than gold
+        self.gold = 0  # The total amount of gold
 
     def add_item(self, item):
         """
         This method allows to add an item to the inventory.
+        Gold is added to the gold total.
+        """
+        if item.type == 'gold':
+            self.gold += item.amount
+            if self.gold:
+                self.items['Gold'] = self.gold
+            return
+        self.instances.setdefault(item.type, {}).setdefault(item.name, []).append(item)
+        self.type_counts[item.type] = self.type_counts.get(item.type, 0) + 1
+        self.size += 1
+        self.items[item.name] = self.items.get(item.name, 0) + 1
+
+    def add_items(self, items):
         """
-        if item.name in self.items:
-            self.items[item.name] += 1
-        else:
-            self.items[item.name] = 1
+        This method allows to add many items to the inventory at once.
+        """
+        for item in items:
+            self.add_item(item)
 
     def remove_item(self, item):
         """
         This method allows to remove an item from the inventory.
+        Removing gold deducts its amount from the gold total, and does nothing if the total is too low.
+        Returns True if the item was removed.
+        """
+        if item.type == 'gold':
+            if item.amount > self.gold:
+                return False
+            self.gold -= item.amount
+            if self.gold:
+                self.items['Gold'] = self.gold
+            else:
+                self.items.pop('Gold', None)
+            return True
+        named = self.instances.get(item.type, {}).get(item.name)
+        if not named:
+            return False
+        for index, instance in enumerate(named):
+            if instance is item:
+                del named[index]
+                break
+        else:
+            named.pop()  # Another item with the same name stands in for one that is not in the inventory
+        if not named:
+            del self.instances[item.type][item.name]
+        self.type_counts[item.type] -= 1
+        self.size -= 1
+        self.items[item.name] -= 1
+        if self.items[item.name] == 0:
+            del self.items[item.name]
+        return True
+
+    def remove_items(self, items):
+        """
+        This method allows to remove many items from the inventory at once.
+        Returns the number of items removed.
         """
-        if item.name in self.items:
-            self.items[item.name] -= 1
-            if self.items[item.name] == 0:
-                del self.items[item.name]
+        return sum(self.remove_item(item) for item in items)
 
     def has_item(self, item):
         """
         This method checks if an item is in the inventory.
+        For gold, it checks that the gold total covers the item's amount.
         """
+        if item.type == 'gold':
+            return self.gold >= item.amount
         return item.name in self.items
 
+    def count(self, name):
+        """
+        This method gets the number of items with a name in the inventory.
+        """
+        return self.items.get(name, 0) if name != 'Gold' else 0
+
+    def count_type(self, item_type):
+        """
+        This method gets the number of items of a type in the inventory. Gold is not counted, see gold.
+        """
+        return self.type_counts.get(item_type, 0)
+
+    def find(self, name, item_type=None):
+        """
+        This method gets an item with a name from the inventory, or None if there is none.
+        """
+        types = (item_type,) if item_type is not None else self.instances
+        for type_name in types:
+            named = self.instances.get(type_name, {}).get(name)
+            if named:
+                return named[-1]
+        return None
+
+    def items_of_type(self, item_type):
+        """
+        This method gets a list of the items of a type in the inventory.
+        """
+        return [item for named in self.instances.get(item_type, {}).values() for item in named]
+
     def use_item(self, item, player):
         """
         This method allows to use an item, applying its effect or equipping it.
@@ -0,0 +1,261 @@
+"""
+Frame time metrics: per-state timing histograms of the phases of a frame, counters of expensive operations,
+a log of stuttering frames, an in-game overlay toggled with F3 and periodic JSON or CSV dumps.
+Everything is off by default; while disabled the game loop only checks metrics.enabled and count() returns at once.
+"""
+import bisect
+import json
+import time
+from collections import deque
+
+from constants import METRICS_DUMP_INTERVAL, STUTTER_MS
+
+HISTOGRAM_BOUNDS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133, 266, 533, 1000)  # Upper bounds of buckets in ms
+PHASES = ("input", "logic", "draw", "frame")  # The phases of a frame, "frame" being the whole of it
+COUNTERS = ("asset_loads", "font_renders", "blits")  # Operations counted by the game, see Metrics.count
+
+
+class Histogram:
+    """
+    Durations in milliseconds counted in fixed buckets, so recording costs the same however many are recorded.
+    """
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)  # Counts per bucket; the last is for longer durations
+        self.count = 0
+        self.total = 0.0  # Sum of the durations
+        self.max = 0.0  # Longest duration
+
+    def add(self, ms):
+        """
+        Records a duration.
+        """
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        """
+        Returns the upper bound of the bucket holding the given fraction of the durations, or the longest duration
+        for the last bucket.
+        """
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BOUNDS, self.buckets):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return self.max
+
+    def summary(self):
+        """
+        Returns the count, mean, percentiles and maximum of the durations.
+        """
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+        }
+
+
+class Metrics:
+    """
+    Collects the metrics of the running game. The game loop calls begin_frame, lap after each phase and end_frame,
+    but only while enabled is set; code doing expensive work calls count.
+    """
+    def __init__(self):
+        self.enabled = False  # Whether metrics are collected
+        self.started = False  # Whether collection was started with start(), so it outlives the overlay
+        self.overlay = False  # Whether the overlay is drawn
+        self.overlay_area = None  # Area the overlay covered when last drawn, see uncovered_area
+        self.histograms = {}  # Histograms by state name, then phase
+        self.counters = {}  # Totals of counted operations
+        self.frame_counters = {}  # Operations counted during the current frame
+        self.last_frame = {}  # Phase durations and counters of the last complete frame
+        self.stutters = deque(maxlen=50)  # The most recent frames longer than STUTTER_MS, with their breakdown
+        self.dump_path = None  # File the metrics are dumped to periodically, as JSON or CSV by its extension
+        self.next_dump = 0.0  # When the next periodic dump is due
+        self.frame_start = 0.0
+        self.lap_start = 0.0
+        self.state_name = None  # Name of the state the current phase is attributed to
+        self.frame_state = None  # Name of the state the frame began in
+        self.phases = {}  # Phase durations of the current frame
+
+    def start(self, dump_path=None):
+        """
+        Enables collection, dumping to dump_path every METRICS_DUMP_INTERVAL seconds if given.
+        """
+        self.enabled = self.started = True
+        self.dump_path = dump_path
+        self.next_dump = time.perf_counter() + METRICS_DUMP_INTERVAL
+
+    def toggle_overlay(self):
+        """
+        Shows or hides the overlay. Collection runs while the overlay is shown or after start() was called.
+        """
+        self.overlay = not self.overlay
+        self.overlay_area = None
+        self.enabled = self.overlay or self.started
+
+    def count(self, name, amount=1):
+        """
+        Counts operations of the given name, e.g. asset loads. Does nothing while metrics are disabled,
+        so callers count unconditionally.
+        """
+        if self.enabled:
+            self.frame_counters[name] = self.frame_counters.get(name, 0) + amount
+
+    def begin_frame(self, state):
+        """
+        Starts timing a frame of the given state.
+        """
+        self.frame_start = self.lap_start = time.perf_counter()
+        self.state_name = self.frame_state = type(state).__name__
+        self.phases = {}
+
+    def lap(self, phase, state):
+        """
+        Records the time since the previous lap as the given phase of the state the phase began in.
+        state is the current state, which the next phase is attributed to.
+        """
+        now = time.perf_counter()
+        ms = (now - self.lap_start) * 1000
+        self.histogram(self.state_name, phase).add(ms)
+        self.phases[phase] = ms
+        self.lap_start = now
+        self.state_name = type(state).__name__
+
+    def end_frame(self):
+        """
+        Records the whole frame, keeps its breakdown if it stuttered and dumps the metrics when due.
+        """
+        now = time.perf_counter()
+        ms = (now - self.frame_start) * 1000
+        self.histogram(self.frame_state, "frame").add(ms)
+        for name, amount in self.frame_counters.items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+        self.last_frame = {"state": self.frame_state, "ms": ms, "phases": self.phases, "counters": self.frame_counters}
+        if ms > STUTTER_MS:
+            self.stutters.append(dict(self.last_frame, time=time.time()))
+        self.frame_counters = {}
+        if self.dump_path is not None and now >= self.next_dump:
+            self.dump(self.dump_path)
+            self.next_dump = now + METRICS_DUMP_INTERVAL
+
+    def histogram(self, state_name, phase):
+        """
+        Returns the histogram of a phase of a state, creating it on first use.
+        """
+        phases = self.histograms.get(state_name)
+        if phases is None:
+            phases = self.histograms[state_name] = {}
+        histogram = phases.get(phase)
+        if histogram is None:
+            histogram = phases[phase] = Histogram()
+        return histogram
+
+    def snapshot(self):
+        """
+        Returns the histogram summaries, counters and stutters collected so far.
+        """
+        return {
+            "histograms": {
+                state_name: {phase: histogram.summary() for phase, histogram in phases.items()}
+                for state_name, phases in self.histograms.items()
+            },
+            "counters": dict(self.counters),
+            "stutters": list(self.stutters),
+        }
+
+    def dump(self, path):
+        """
+        Writes a snapshot to path: the whole snapshot as JSON if path ends in .json,
+        otherwise one CSV row per state and phase, with the counters and stutters written next to it
+        as <path>.counters.csv and <path>.stutters.csv.
+        """
+        snapshot = self.snapshot()
+        with open(path, "w") as file:
+            if path.endswith(".json"):
+                json.dump(snapshot, file, indent=1)
+                return
+            columns = ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+            file.write("state,phase," + ",".join(columns) + "\n")
+            for state_name, phases in snapshot["histograms"].items():
+                for phase, summary in phases.items():
+                    file.write(f"{state_name},{phase}," + ",".join(f"{summary[name]:g}" for name in columns) + "\n")
+        base = path[:-4] if path.endswith(".csv") else path
+        with open(base + ".counters.csv", "w") as file:
+            file.write("counter,total\n")
+            file.writelines(f"{name},{total}\n" for name, total in snapshot["counters"].items())
+        with open(base + ".stutters.csv", "w") as file:
+            file.write("time,state,ms," + ",".join(f"{phase}_ms" for phase in PHASES[:3]) + "," + ",".join(COUNTERS) + "\n")
+            for stutter in snapshot["stutters"]:
+                phases = ",".join(f"{stutter['phases'].get(phase, 0):g}" for phase in PHASES[:3])
+                counters = ",".join(str(stutter["counters"].get(name, 0)) for name in COUNTERS)
+                file.write(f"{stutter['time']:.3f},{stutter['state']},{stutter['ms']:g},{phases},{counters}\n")
+
+    def reset(self):
+        """
+        Drops every histogram, counter and stutter collected so far.
+        """
+        self.histograms.clear()
+        self.counters.clear()
+        self.frame_counters.clear()
+        self.stutters.clear()
+
+    def render_overlay(self):
+        """
+        Renders the overlay's text on a black background and returns the surface.
+        """
+        import pygame
+
+        from text import get_font
+
+        lines = []
+        frame = self.last_frame
+        if frame:
+            phases = "  ".join(f"{phase} {frame['phases'].get(phase, 0):.2f}" for phase in PHASES[:3])
+            lines.append(f"{frame['state']}  {frame['ms']:.2f} ms  ({phases})")
+            histogram = self.histograms[frame["state"]]["frame"]
+            lines.append(f"p50 {histogram.percentile(0.5)}  p95 {histogram.percentile(0.95)}  "
+                         f"p99 {histogram.percentile(0.99)}  max {histogram.max:.1f} ms")
+        lines.append("  ".join(f"{name} {self.counters.get(name, 0)}" for name in COUNTERS))
+        lines.append(f"stutters > {STUTTER_MS:.1f} ms: {len(self.stutters)}")
+        font = get_font(None, 18)
+        surfaces = [font.render(line, True, (255, 255, 0)) for line in lines]  # Uncached, the numbers keep changing
+        width = max(surface.get_width() for surface in surfaces) + 8
+        height = sum(surface.get_height() for surface in surfaces) + 8
+        overlay = pygame.Surface((width, height))
+        y = 4
+        for surface in surfaces:
+            overlay.blit(surface, (4, y))
+            y += surface.get_height()
+        self.count("blits", len(surfaces))
+        return overlay
+
+    def uncovered_area(self, overlay):
+        """
+        Returns the area the overlay covered on its last draw that the rendered overlay will not cover,
+        as a rect to repaint the scene in, or None.
+        """
+        if self.overlay_area is None or overlay.get_rect().contains(self.overlay_area):
+            return None
+        return self.overlay_area
+
+    def draw_overlay(self, screen, overlay=None):
+        """
+        Draws the overlay, rendered by render_overlay unless given, in the top left corner of the screen
+        and returns the area it covers.
+        """
+        if overlay is None:
+            overlay = self.render_overlay()
+        self.overlay_area = screen.blit(overlay, (0, 0))
+        self.count("blits")
+        return self.overlay_area
+
+
+metrics = Metrics()  # The process-wide metrics
@@ -0,0 +1,177 @@
+import pygame
+
+from constants import (
+    MINIMAP_CELL_SIZE,
+    MINIMAP_COLORS,
+    MINIMAP_FOG_COLOR,
+    MINIMAP_MARGIN,
+    MINIMAP_PLAYER_COLOR,
+    MINIMAP_REVEALED_COLOR,
+    MINIMAP_SIZE,
+)
+
+PAGE_SHIFT = 15  # A bitset page holds 2 ** PAGE_SHIFT bits, i.e. 4 KiB
+
+
+class Bitset:
+    """
+    A set of room indices kept as one bit per room. The bits live in pages allocated when a bit in them is first
+    set, so a bitset over a huge dungeon only takes memory for the parts the player explored.
+    """
+    def __init__(self):
+        self.pages = {}  # Pages of bits by page number
+
+    def __contains__(self, index):
+        page = self.pages.get(index >> PAGE_SHIFT)
+        return page is not None and bool(page[(index & ((1 << PAGE_SHIFT) - 1)) >> 3] & (1 << (index & 7)))
+
+    def add(self, index):
+        """
+        Sets the bit of index. Returns True if it was not set before.
+        """
+        page = self.pages.get(index >> PAGE_SHIFT)
+        if page is None:
+            page = self.pages[index >> PAGE_SHIFT] = bytearray(1 << (PAGE_SHIFT - 3))
+        offset, bit = (index & ((1 << PAGE_SHIFT) - 1)) >> 3, 1 << (index & 7)
+        if page[offset] & bit:
+            return False
+        page[offset] |= bit
+        return True
+
+
+class Minimap:
+    """
+    A minimap of a dungeon under fog of war.
+
+    Rooms the player visited are shown in the colour of their event, rooms next to them are revealed as unexplored,
+    and every other room stays hidden. Both are kept as paged bitsets with one bit per room.
+    The minimap is drawn on one persistent surface covering a viewport of the dungeon around the player:
+    a move only repaints the cells it revealed or visited and the player's old and new cells,
+    and only cells inside the viewport are ever painted, so its cost does not depend on the size of the dungeon.
+    """
+    def __init__(self, dungeon, size=MINIMAP_SIZE, cell_size=MINIMAP_CELL_SIZE):
+        """
+        Initializes a minimap of the dungeon with nothing visited yet.
+
+        Args:
+            dungeon: A Dungeon, CompactDungeon or ChunkedDungeon.
+            size (tuple): The width and height of the minimap in pixels.
+            cell_size (int): The width and height of a room on the minimap in pixels.
+        """
+        self.dungeon = dungeon
+        self.cell_size = cell_size
+        self.columns = size[0] // cell_size  # Rooms shown per row of the viewport
+        self.rows = size[1] // cell_size  # Rooms shown per column of the viewport
+        self.visited = Bitset()  # The rooms the player entered
+        self.revealed = Bitset()  # The rooms visited or next to a visited room
+        self.surface = pygame.Surface((self.columns * cell_size, self.rows * cell_size))
+        self.surface.fill(MINIMAP_FOG_COLOR)
+        self.origin = (0, 0)  # Row and column of the room in the top left corner of the viewport
+        self.player = None  # The room the player is in
+
+    def is_visited(self, i, j):
+        """
+        Returns True if the player entered the room at row i, column j.
+        """
+        return i * self.dungeon.size + j in self.visited
+
+    def is_revealed(self, i, j):
+        """
+        Returns True if the room at row i, column j is visited or next to a visited room.
+        """
+        return i * self.dungeon.size + j in self.revealed
+
+    def visit(self, i, j):
+        """
+        Marks the room at row i, column j as visited, reveals its neighbours and moves the player there.
+        Scrolls the viewport if the player came within MINIMAP_MARGIN rooms of its edge.
+        Returns the rects of the minimap surface that changed.
+        """
+        changed = []
+        if self.player is not None:
+            changed.append(self.player)
+        self.player = (i, j)
+        size = self.dungeon.size
+        index = i * size + j
+        if self.visited.add(index):
+            self.revealed.add(index)
+            for ni, nj in self.dungeon.generate_directions(i, j).values():
+                if self.revealed.add(ni * size + nj):
+                    changed.append((ni, nj))
+        changed.append(self.player)
+        scrolled = self.scroll_to(i, j)
+        rects = [rect for rect in (self.paint_cell(*cell) for cell in changed) if rect is not None]
+        return [self.surface.get_rect()] if scrolled else rects
+
+    def refresh_room(self, i, j):
+        """
+        Repaints the room at row i, column j, e.g. after its event changed. Returns the rect that changed, or None.
+        """
+        return self.paint_cell(i, j)
+
+    def cell_rect(self, i, j):
+        """
+        Returns the rect of the room at row i, column j on the minimap surface, or None if it is outside the viewport.
+        """
+        row, column = i - self.origin[0], j - self.origin[1]
+        if not (0 <= row < self.rows and 0 <= column < self.columns):
+            return None
+        return pygame.Rect(column * self.cell_size, row * self.cell_size, self.cell_size, self.cell_size)
+
+    def paint_cell(self, i, j):
+        """
+        Paints the room at row i, column j if it is inside the viewport and returns its rect, or None.
+        """
+        rect = self.cell_rect(i, j)
+        if rect is None:
+            return None
+        self.surface.fill(MINIMAP_FOG_COLOR, rect)  # Also the border between rooms
+        if self.is_visited(i, j):
+            self.surface.fill(MINIMAP_COLORS[self.dungeon.event_at(i, j)], rect.inflate(-1, -1))
+        elif self.is_revealed(i, j):
+            self.surface.fill(MINIMAP_REVEALED_COLOR, rect.inflate(-1, -1))
+        if (i, j) == self.player:
+            self.surface.fill(MINIMAP_PLAYER_COLOR, rect.inflate(-self.cell_size // 2, -self.cell_size // 2))
+        return rect
+
+    def scroll_to(self, i, j):
+        """
+        Recentres the viewport on the room at row i, column j if it is within MINIMAP_MARGIN rooms of the edge
+        and the dungeon extends further. The surface is scrolled and only the cells that came into view are painted.
+        Returns True if the viewport moved.
+        """
+        size = self.dungeon.size
+        top, left = self.origin
+        margin_rows = min(MINIMAP_MARGIN, (self.rows - 1) // 2)
+        margin_columns = min(MINIMAP_MARGIN, (self.columns - 1) // 2)
+        if top + margin_rows <= i < top + self.rows - margin_rows:
+            new_top = top
+        else:
+            new_top = i - self.rows // 2
+        if left + margin_columns <= j < left + self.columns - margin_columns:
+            new_left = left
+        else:
+            new_left = j - self.columns // 2
+        new_top = max(0, min(new_top, size - self.rows))
+        new_left = max(0, min(new_left, size - self.columns))
+        if (new_top, new_left) == self.origin:
+            return False
+        self.surface.scroll((left - new_left) * self.cell_size, (top - new_top) * self.cell_size)
+        self.origin = (new_top, new_left)
+        for row in range(new_top, min(new_top + self.rows, size)):
+            old_row = top <= row < top + self.rows
+            for column in range(new_left, min(new_left + self.columns, size)):
+                if not (old_row and left <= column < left + self.columns):
+                    self.paint_cell(row, column)
+        return True
+
+    def repaint(self):
+        """
+        Repaints every room in the viewport. Returns the rect of the whole surface.
+        """
+        self.surface.fill(MINIMAP_FOG_COLOR)
+        top, left = self.origin
+        for row in range(top, min(top + self.rows, self.dungeon.size)):
+            for column in range(left, min(left + self.columns, self.dungeon.size)):
+                self.paint_cell(row, column)
+        return self.surface.get_rect()
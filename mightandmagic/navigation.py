@@ -0,0 +1,282 @@
+import heapq
+from array import array
+
+from constants import EVENT_CODES
+
+DIRECTION_NAMES = ('north', 'south', 'west', 'east')
+
+
+class NavigationIndex:
+    """
+    A navigation index over a dungeon: reachability, shortest paths and a distance field from the exit.
+
+    Rooms are addressed by their flat index i * size + j, and neighbours are derived arithmetically, so the
+    index costs a few bytes per room and its searches scale to dungeons of millions of rooms.
+    Rooms whose event is in blocked_events cannot be entered. By default every room can, so every room reaches
+    the exit; reachability and validation only tell something once events are blocked, e.g. AUTO_WALK_AVOIDED_EVENTS.
+    The index listens to the dungeon's set_event and updates itself when a room changes.
+    """
+    def __init__(self, dungeon, blocked_events=()):
+        """
+        Builds the index from the dungeon's current events and computes the distance field from the exit.
+
+        Args:
+            dungeon: A Dungeon or CompactDungeon. A ChunkedDungeon is refused with ValueError, since indexing it
+                would generate every one of its chunks.
+            blocked_events (iterable): Events of rooms that cannot be entered.
+        """
+        if getattr(dungeon, "chunked", False):
+            raise ValueError("A navigation index needs the whole event grid and cannot be built over a ChunkedDungeon.")
+        self.dungeon = dungeon
+        self.size = dungeon.size
+        self.blocked_codes = frozenset(EVENT_CODES[event] for event in blocked_events)
+        self.events = bytearray(dungeon.event_grid())  # Snapshot of the event codes, kept current by update_room
+        self.open = bytearray(0 if code in self.blocked_codes else 1 for code in self.events) if self.blocked_codes \
+            else bytearray(b'\x01') * len(self.events)  # 1 for every room that can be entered
+        self.exit = self.size * self.size - 1  # The exit is always the bottom right room
+        self.exit_distance = self.distance_field([self.exit])  # Moves from each room to the exit, -1 if unreachable
+        self.stale = False  # Whether exit_distance must be recomputed before its next use
+        dungeon.add_listener(self.update_room)
+
+    def index(self, i, j):
+        """
+        Returns the flat index of the room at row i, column j.
+        """
+        return i * self.size + j
+
+    def position(self, index):
+        """
+        Returns the (row, column) of the room at a flat index.
+        """
+        return divmod(index, self.size)
+
+    def neighbours(self, index):
+        """
+        Returns the flat indices of the rooms adjacent to a room, in the order north, south, west, east,
+        with None where the room is on the edge of the dungeon.
+        """
+        size = self.size
+        column = index % size
+        return (
+            index - size if index >= size else None,
+            index + size if index < size * (size - 1) else None,
+            index - 1 if column > 0 else None,
+            index + 1 if column < size - 1 else None,
+        )
+
+    def distance_field(self, sources):
+        """
+        Returns the number of moves from every room to the nearest of the source rooms (flat indices),
+        computed with a breadth-first search. Rooms that cannot reach a source get -1.
+        """
+        size = self.size
+        last_row = size * (size - 1)
+        is_open = self.open
+        distance = array('i', [-1]) * len(is_open)
+        frontier = [source for source in sources if is_open[source]]
+        for source in frontier:
+            distance[source] = 0
+        step = 0
+        while frontier:
+            step += 1
+            reached = []
+            for index in frontier:
+                column = index % size
+                if index >= size:
+                    other = index - size
+                    if distance[other] < 0 and is_open[other]:
+                        distance[other] = step
+                        reached.append(other)
+                if index < last_row:
+                    other = index + size
+                    if distance[other] < 0 and is_open[other]:
+                        distance[other] = step
+                        reached.append(other)
+                if column > 0:
+                    other = index - 1
+                    if distance[other] < 0 and is_open[other]:
+                        distance[other] = step
+                        reached.append(other)
+                if column < size - 1:
+                    other = index + 1
+                    if distance[other] < 0 and is_open[other]:
+                        distance[other] = step
+                        reached.append(other)
+            frontier = reached
+        return distance
+
+    def refresh(self):
+        """
+        Recomputes the distance field from the exit if a room was blocked since it was last computed.
+        """
+        if self.stale:
+            self.exit_distance = self.distance_field([self.exit])
+            self.stale = False
+
+    def distance_to_exit(self, i, j):
+        """
+        Returns the number of moves from the room at row i, column j to the exit, or -1 if it cannot be reached.
+        """
+        self.refresh()
+        return self.exit_distance[self.index(i, j)]
+
+    def next_step_to_exit(self, i, j):
+        """
+        Returns the direction ('north', 'south', 'west' or 'east') of a move towards the exit along a shortest path,
+        or None if the room is the exit or the exit cannot be reached.
+        From a blocked room, e.g. a trap the player stands in, the move leads to the open neighbour nearest the exit.
+        """
+        self.refresh()
+        index = self.index(i, j)
+        distance = self.exit_distance[index]
+        if distance < 0 and not self.open[index]:
+            steps = [
+                (self.exit_distance[other], direction)
+                for direction, other in zip(DIRECTION_NAMES, self.neighbours(index))
+                if other is not None and self.exit_distance[other] >= 0
+            ]
+            return min(steps)[1] if steps else None
+        if distance <= 0:
+            return None
+        for direction, other in zip(DIRECTION_NAMES, self.neighbours(index)):
+            if other is not None and self.exit_distance[other] == distance - 1:
+                return direction
+        return None
+
+    def path_to_exit(self, i, j):
+        """
+        Returns the rooms on a shortest path from the room at row i, column j to the exit, both included,
+        or None if the exit cannot be reached. Follows the distance field, so no search is needed.
+        """
+        self.refresh()
+        index = self.index(i, j)
+        distance = self.exit_distance[index]
+        if distance < 0:
+            return None
+        path = [index]
+        while distance > 0:
+            for other in self.neighbours(index):
+                if other is not None and self.exit_distance[other] == distance - 1:
+                    index = other
+                    break
+            distance -= 1
+            path.append(index)
+        return [self.position(index) for index in path]
+
+    def shortest_path(self, start, goal):
+        """
+        Returns the rooms on a shortest path between two (row, column) positions, both included,
+        or None if the goal cannot be reached. Searches with A* and the Manhattan distance as heuristic.
+        """
+        size = self.size
+        start_index = self.index(*start)
+        goal_index = self.index(*goal)
+        if not self.open[start_index] or not self.open[goal_index]:
+            return None
+        goal_row, goal_column = goal
+        came_from = {start_index: None}
+        cost = {start_index: 0}
+        heap = [(abs(start[0] - goal_row) + abs(start[1] - goal_column), 0, start_index)]  # (estimate, -moves, room)
+        while heap:
+            _, moves, index = heapq.heappop(heap)
+            moves = -moves  # Ties on the estimate expand the room furthest from the start first
+            if index == goal_index:
+                path = []
+                while index is not None:
+                    path.append(self.position(index))
+                    index = came_from[index]
+                return path[::-1]
+            if moves > cost[index]:
+                continue  # A shorter way to this room was already expanded
+            for other in self.neighbours(index):
+                if other is None or not self.open[other] or cost.get(other, moves + 2) <= moves + 1:
+                    continue
+                cost[other] = moves + 1
+                came_from[other] = index
+                row, column = divmod(other, size)
+                heapq.heappush(heap, (moves + 1 + abs(row - goal_row) + abs(column - goal_column), -(moves + 1), other))
+        return None
+
+    def reachable(self, i, j):
+        """
+        Returns a bytearray with 1 for every room that can be reached from the room at row i, column j.
+        """
+        distance = self.distance_field([self.index(i, j)])
+        return bytearray(1 if moves >= 0 else 0 for moves in distance)
+
+    def all_reach_exit(self):
+        """
+        Returns True if the exit can be reached from every room that can be entered.
+        Used to validate generated dungeons against the index's blocked events.
+        """
+        self.refresh()
+        return all(moves >= 0 or not is_open for moves, is_open in zip(self.exit_distance, self.open))
+
+    def nearest(self, i, j, event):
+        """
+        Returns ((row, column), moves) of the room with the given event nearest to the room at row i, column j,
+        or None if no such room can be reached. The search stops as soon as one is found.
+        """
+        code = EVENT_CODES[event]
+        start = self.index(i, j)
+        if not self.open[start]:
+            return None
+        seen = bytearray(len(self.open))
+        seen[start] = 1
+        frontier = [start]
+        moves = 0
+        while frontier:
+            for index in frontier:
+                if self.events[index] == code:
+                    return self.position(index), moves
+            moves += 1
+            reached = []
+            for index in frontier:
+                for other in self.neighbours(index):
+                    if other is not None and not seen[other] and self.open[other]:
+                        seen[other] = 1
+                        reached.append(other)
+            frontier = reached
+        return None
+
+    def update_room(self, i, j):
+        """
+        Updates the index after the event of the room at row i, column j changed. Called by the dungeon's set_event.
+        Opening a room lowers distances around it in place; blocking a room marks the distance field
+        for recomputation on its next use, since any room whose shortest path went through it may be affected.
+        """
+        index = self.index(i, j)
+        code = EVENT_CODES[self.dungeon.event_at(i, j)]
+        self.events[index] = code
+        is_open = 0 if code in self.blocked_codes else 1
+        if is_open == self.open[index]:
+            return
+        self.open[index] = is_open
+        if not is_open:
+            self.exit_distance[index] = -1
+            self.stale = True
+        elif not self.stale:
+            self.relax(index)
+
+    def relax(self, index):
+        """
+        Lowers the exit distances of the rooms around a newly opened room, spreading outwards while they improve.
+        """
+        distance = self.exit_distance
+        known = [distance[other] for other in self.neighbours(index) if other is not None and distance[other] >= 0]
+        if index == self.exit:
+            distance[index] = 0
+        elif known:
+            distance[index] = min(known) + 1
+        else:
+            return  # Still cut off from the exit
+        frontier = [index]
+        while frontier:
+            reached = []
+            for current in frontier:
+                moves = distance[current] + 1
+                for other in self.neighbours(current):
+                    if other is not None and self.open[other] and (distance[other] < 0 or distance[other] > moves):
+                        distance[other] = moves
+                        reached.append(other)
+            frontier = reached
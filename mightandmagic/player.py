@@ -3,7 +3,11 @@ from inventory import Gold, Inventory
 class Player:
     """
     The Player class is an abstract representation of a player in the game.
+    Players use __slots__ so the hundreds of thousands kept alive by simulations stay small;
+    see entities.py for bulk storage.
     """
+    __slots__ = ('name', 'health', 'defense', 'dodge', 'inventory', 'level', 'exp', 'weapon')
+
     def __init__(self, name, health, defense, dodge):
         """
         Constructor for the Player class.
@@ -68,6 +72,8 @@ class Rogue(Player):
     """
     The Rogue class is a specific type of player with unique attributes.
     """
+    __slots__ = ('stealth',)
+
     def __init__(self, name):
         """
         Constructor for the Rogue class.
@@ -80,6 +86,8 @@ class Wizard(Player):
     """
     The Wizard class is a specific type of player with unique attributes.
     """
+    __slots__ = ('magic',)
+
     def __init__(self, name):
         """
         Constructor for the Wizard class.
@@ -92,6 +100,8 @@ class Warrior(Player):
     """
     The Warrior class is a specific type of player with unique attributes.
     """
+    __slots__ = ('strength',)
+
     def __init__(self, name):
         """
         Constructor for the Warrior class.
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import asset_cache, asset_key
+from constants import (
+    BOTTOM_UI_HEIGHT,
+    BOTTOM_UI_PAPER_IMAGE,
+    BUTTON_BG_IMAGE,
+    CHARACTER_SELECT_BG,
+    DIRECTION_BUTTON_SIZE,
+    INTRO_BG_IMAGE_PATH,
+    MAIN_MENU_BG,
+    MENU_BUTTON_SIZE,
+    PRELOAD_WORKERS,
+    ROOM_IMAGE_SIZE,
+    ROOM_IMAGES,
+    ROOM_PAPER_IMAGE,
+    SCREEN_WIDTH,
+    VIEWPORT_TILE_SIZE,
+)
+
+_executor = None  # The pool decoding assets, created by start_preloading
+
+
+def build_manifest():
+    """
+    Returns the asset cache keys of every image the game loads, in the order they are first needed.
+    """
+    manifest = [
+        asset_key(INTRO_BG_IMAGE_PATH, with_alpha=False, scale=True),
+        asset_key(MAIN_MENU_BG, with_alpha=False, scale=True),
+        asset_key(BUTTON_BG_IMAGE, with_alpha=True, scale=True, size=MENU_BUTTON_SIZE),
+        asset_key(CHARACTER_SELECT_BG, with_alpha=False, scale=True),
+        asset_key(BOTTOM_UI_PAPER_IMAGE, with_alpha=True, scale=True, size=(SCREEN_WIDTH, BOTTOM_UI_HEIGHT)),
+        asset_key(BUTTON_BG_IMAGE, with_alpha=True, scale=True, size=DIRECTION_BUTTON_SIZE),
+        asset_key(ROOM_PAPER_IMAGE, with_alpha=False, scale=False),
+    ]
+    for images in ROOM_IMAGES.values():
+        manifest.extend(asset_key(name, with_alpha=False, size=ROOM_IMAGE_SIZE) for name in images)
+    tile_size = (VIEWPORT_TILE_SIZE, VIEWPORT_TILE_SIZE)
+    manifest.extend(asset_key(images[0], with_alpha=False, size=tile_size) for images in ROOM_IMAGES.values())
+    return manifest
+
+
+def start_preloading(manifest=None, workers=PRELOAD_WORKERS):
+    """
+    Starts decoding and scaling the assets of the manifest on a pool of worker threads.
+    The main loop converts them as they finish, and image_loader waits for any asset still in flight.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preload")
+    asset_cache.prefetch(build_manifest() if manifest is None else manifest, _executor)
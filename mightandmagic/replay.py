@@ -0,0 +1,235 @@
+"""
+Deterministic recording and replay of play sessions.
+Dungeon generation and room images draw from the random module, so a session is reproduced exactly by seeding it
+with the recorded seed and feeding the recorded events back frame by frame with the same number of logic steps.
+Record with: python mightandmagic record [PATH] [--seed N] [--dungeon-size N]
+Replay with: python mightandmagic replay PATH [--trace CSV] [--metrics PATH]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+
+REPLAY_VERSION = 1
+
+
+def encode_event(event):
+    """
+    Returns a pygame event as a JSON-compatible list of its type and attributes.
+    Attributes that cannot be written as JSON, such as window objects, are dropped.
+    """
+    attributes = {}
+    for name, value in event.dict.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        if value is None or isinstance(value, (bool, int, float, str)) or (
+                isinstance(value, list) and all(isinstance(item, (int, float)) for item in value)):
+            attributes[name] = value
+    return [event.type, attributes]
+
+
+def decode_event(encoded):
+    """
+    Rebuilds a pygame event written by encode_event.
+    """
+    import pygame
+
+    event_type, attributes = encoded
+    attributes = {name: tuple(value) if isinstance(value, list) else value for name, value in attributes.items()}
+    return pygame.event.Event(event_type, attributes)
+
+
+class Recorder:
+    """
+    Writes the events and logic steps of every frame to a log, one JSON line per frame.
+    The first line holds the seed of the random module and the size of new dungeons, and the last a fingerprint of the final game state.
+    """
+    def __init__(self, path, seed, dungeon_size):
+        """
+        Opens the log at path and writes its header.
+        """
+        self.file = open(path, "w")
+        self.frame = 0  # Number of frames recorded
+        json.dump({"version": REPLAY_VERSION, "seed": seed, "dungeon_size": dungeon_size}, self.file)
+        self.file.write("\n")
+
+    def record(self, events, steps):
+        """
+        Records the events handled and the logic steps run in a frame.
+        """
+        json.dump([self.frame, steps, [encode_event(event) for event in events]], self.file)
+        self.file.write("\n")
+        self.frame += 1
+
+    def close(self, game):
+        """
+        Writes the fingerprint of the game's final state and closes the log.
+        """
+        json.dump({"frames": self.frame, "fingerprint": fingerprint(game)}, self.file)
+        self.file.write("\n")
+        self.file.close()
+
+
+def read_log(path):
+    """
+    Reads a log written by a Recorder.
+
+    Returns:
+        (header, frames, footer): The header, a list of (steps, encoded events) per frame, and the footer,
+            or None if the recording was cut short.
+    """
+    frames = []
+    footer = None
+    with open(path) as file:
+        header = json.loads(file.readline())
+        if header.get("version") != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay.")
+        for line in file:
+            entry = json.loads(line)
+            if isinstance(entry, dict):
+                footer = entry
+            else:
+                frames.append((entry[1], entry[2]))
+    return header, frames, footer
+
+
+def fingerprint(game):
+    """
+    Returns a short digest of the game's state that is identical for identical sessions.
+    """
+    from bench import walk_fingerprint
+
+    return f"{type(game.state).__name__}:{walk_fingerprint(game)}"
+
+
+def session_saves():
+    """
+    Returns a temporary directory, empty at first, for the saves of a recorded or replayed session and points
+    new games at it. Quick saves and loads then behave the same on every replay, and leave no files behind.
+    Autosaving is turned off, since the autosave would be thrown away with the directory.
+    """
+    from states import NewGameState
+
+    directory = tempfile.TemporaryDirectory(prefix="mightandmagic-session-")
+    NewGameState.save_dir = directory.name
+    NewGameState.autosave_moves = 0
+    return directory
+
+
+def record(path, seed=None, dungeon_size=None):
+    """
+    Plays the game normally while recording the session to path. The session saves to a temporary directory.
+    """
+    from game import MightAndMagic
+    from states import NewGameState
+
+    seed = random.getrandbits(32) if seed is None else seed
+    random.seed(seed)
+    if dungeon_size is not None:
+        NewGameState.dungeon_size = dungeon_size
+    with session_saves():
+        game = MightAndMagic()
+        game.recorder = Recorder(path, seed, NewGameState.dungeon_size)
+        try:
+            game.main_loop()
+        finally:
+            game.recorder.close(game)
+            print(f"Recorded {game.recorder.frame} frames to {path} (seed {seed}).")
+
+
+def replay(path, on_frame=None):
+    """
+    Replays a recorded session headless, running frames back to back without waiting between them.
+    Playback stops at the first QUIT event or when the game quits from its menu, as the recorded game did.
+    Like the recording, the replay saves to a temporary directory that starts empty.
+    on_frame(frame, state_name, steps, event_count, seconds) is called after each frame.
+
+    Returns:
+        (game, footer): The game after the last frame and the footer of the log.
+    """
+    import pygame
+
+    from bench import init_headless
+    from constants import DUNGEON_SIZE
+    from game import MightAndMagic
+    from states import NewGameState
+
+    header, frames, footer = read_log(path)
+    init_headless()
+    random.seed(header["seed"])
+    NewGameState.dungeon_size = header.get("dungeon_size", DUNGEON_SIZE)
+    with session_saves():
+        game = MightAndMagic()
+        for frame, (steps, encoded) in enumerate(frames):
+            events = [decode_event(event) for event in encoded]
+            quit_index = next((k for k, event in enumerate(events) if event.type == pygame.QUIT), None)
+            if quit_index is not None:
+                game._handle_input(events[:quit_index])  # The recorded game handled these, then quit
+                break
+            state_name = type(game.state).__name__
+            start = time.perf_counter()
+            try:
+                game._step(events, steps)
+            except SystemExit:
+                break  # QuitState quit the game; compare the state it quit in
+            if on_frame is not None:
+                on_frame(frame, state_name, steps, len(events), time.perf_counter() - start)
+    return game, footer
+
+
+def main(argv):
+    """
+    Runs the record or replay command. Replays print per-state frame times, write a frame-by-frame trace
+    if asked, and fail if the final state differs from the recording.
+    """
+    if argv[:1] == ["record"]:
+        parser = argparse.ArgumentParser(prog="mightandmagic record", description="Play while recording input.")
+        parser.add_argument("path", nargs="?", default="session.replay")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--dungeon-size", type=int, default=None, help="width and height in rooms of new dungeons")
+        args = parser.parse_args(argv[1:])
+        record(args.path, args.seed, args.dungeon_size)
+        return 0
+
+    from bench import report
+
+    parser = argparse.ArgumentParser(prog="mightandmagic replay", description="Replay a recorded session headless.")
+    parser.add_argument("path")
+    parser.add_argument("--trace", metavar="CSV", help="write the time of every frame to CSV")
+    parser.add_argument("--metrics", metavar="PATH", help="collect frame metrics and write them to PATH (.json or .csv)")
+    args = parser.parse_args(argv[1:])
+    if args.metrics:
+        from metrics import metrics
+        metrics.start()
+    trace = []
+    phases = {}
+
+    def record_frame(frame, state_name, steps, event_count, seconds):
+        trace.append((frame, state_name, steps, event_count, seconds * 1000))
+        phases.setdefault(state_name, []).append(seconds * 1000)
+
+    start = time.perf_counter()
+    game, footer = replay(args.path, record_frame)
+    elapsed = time.perf_counter() - start
+    for state_name, samples in phases.items():
+        report(f"replay {state_name} ({len(samples)} frames)", samples)
+    print(f"{'replay total':<40} {len(trace)} frames in {elapsed:.3f} s")
+    if args.trace:
+        with open(args.trace, "w") as file:
+            file.write("frame,state,steps,events,ms\n")
+            file.writelines(f"{frame},{state},{steps},{count},{ms:.4f}\n" for frame, state, steps, count, ms in trace)
+    if args.metrics:
+        metrics.dump(args.metrics)
+    result = fingerprint(game)
+    if footer is None:
+        print(f"{'replay fingerprint':<40} {result} (recording has no fingerprint)")
+        return 0
+    matches = result == footer["fingerprint"]
+    print(f"{'replay fingerprint':<40} {result} ({'matches' if matches else 'differs from ' + footer['fingerprint']})")
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,8 +1,10 @@
 import pygame
 import random
-from constants import ROOM_IMAGES
+from constants import ROOM_DESCRIPTION_RECT, ROOM_IMAGE_SIZE, ROOM_IMAGES, ROOM_PAPER_IMAGE
+from text import render_text
 from utils import image_loader
 
+
 class Room:
     """
     The Room class represents a room in the dungeon.
@@ -10,18 +12,52 @@ class Room:
     def __init__(self, description, event, directions):
         """
         Constructor for the Room class.
-        Initializes the room's description, event, directions, and image.
+        Initializes the room's description, event and directions.
+        The room's image is only loaded the first time it is needed.
         """
         self.description = description  # The room's description
         self.event = event  # The room's event
         self.directions = directions  # The room's directions
-        self.image = self.bg_loader()  # The room's image
+
+    @property
+    def description(self):
+        """
+        The room's description. Changing it invalidates the prerendered description panel.
+        """
+        return self._description
+
+    @description.setter
+    def description(self, description):
+        self._description = description
+        self.description_panel = None  # Prerendered paper with the description, built on first draw
+
+    @property
+    def event(self):
+        """
+        The room's event. Changing it discards the room's image so it is reloaded for the new event.
+        """
+        return self._event
+
+    @event.setter
+    def event(self, event):
+        self._event = event
+        self._image = None
+
+    @property
+    def image(self):
+        """
+        The room's image, scaled to its size on screen and converted to the display's pixel format.
+        It is loaded on first access so rooms that are never seen cost nothing.
+        """
+        if self._image is None:
+            self._image = self.bg_loader()
+        return self._image
 
     def bg_loader(self):
         """
         Loads an image of the room based on its event.
         """
-        return image_loader(random.choice(ROOM_IMAGES[self.event]), with_alpha=False)
+        return image_loader(random.choice(ROOM_IMAGES[self.event]), with_alpha=False, size=ROOM_IMAGE_SIZE)
 
     def display(self, screen):
         """
@@ -35,14 +71,28 @@ class Room:
         """
         Draws the room image on the screen.
         """
-        screen.blit(pygame.transform.scale(self.image, (800, 600)), (0, 0))
+        screen.blit(self.image, (0, 0))
 
     def draw_room_description(self, screen):
         """
         Draws the room description on a piece of paper and displays it on the screen.
+        The panel is rendered once and reused until the description changes.
+        """
+        screen.blit(self.description_surface(), ROOM_DESCRIPTION_RECT[:2])
+
+    def description_surface(self):
+        """
+        Returns the prerendered description panel, rendering it if the description changed.
+        """
+        if self.description_panel is None:
+            self.description_panel = self.render_description_panel()
+        return self.description_panel
+
+    def render_description_panel(self):
+        """
+        Renders the room description onto a copy of the paper image, scaled to the panel size.
         """
-        font = pygame.font.Font(None, 36)  # Font for the room description
-        paper = pygame.image.load("assets/backgrounds/empty4.jpg")  # Image of the paper
-        text = font.render(self.description, True, (0, 0, 0))  # Rendered text of the room description
+        paper = image_loader(ROOM_PAPER_IMAGE, with_alpha=False, scale=False).copy()  # Image of the paper
+        text = render_text(self.description, 36, (0, 0, 0))  # Rendered text of the room description
         paper.blit(text, (50, 50))  # Blit the text onto the paper
-        screen.blit(pygame.transform.scale(paper, (300, 200)), (250, 200))  # Scale the paper and blit it onto the screen
+        return pygame.transform.scale(paper, ROOM_DESCRIPTION_RECT[2:])
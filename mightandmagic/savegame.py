@@ -0,0 +1,508 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from constants import EVENT_CODES, EVENTS
+from dungeon import ChunkedDungeon, CompactDungeon, Dungeon
+from inventory import EFFECTS, Consumable, Gold, Weapon
+from player import Rogue, Warrior, Wizard
+
+SAVE_MAGIC = b"MMSV"
+SAVE_VERSION = 2
+SAVE_HEADER = struct.Struct("<4sHB")  # Magic, version, dungeon kind
+SECTION_HEADER = struct.Struct("<4sI")  # Section tag, length of the section's payload
+SAVE_BLOCK_SIZE = 4096  # Bytes of the event grid compared and rewritten together by delta saves
+JOURNAL_MAGIC = b"MMJL"
+JOURNAL_PATCH = struct.Struct("<QI")  # Position in the save and length of the bytes written there
+JOURNAL_COMMIT = struct.Struct("<4sQI")  # DONE, length of the patched save, CRC-32 of the patches before it
+
+DUNGEON_KINDS = (Dungeon, CompactDungeon, ChunkedDungeon)  # Dungeon classes by their kind in the header
+PLAYER_CLASSES = {cls.__name__: cls for cls in (Rogue, Wizard, Warrior)}
+ITEM_CLASSES = (Weapon, Consumable)  # Item classes by their code in item records
+
+GRID = struct.Struct("<I")  # GRID section: dungeon size, followed by one event code per room
+CHUNKED = struct.Struct("<QIII")  # CHNK section: world seed, size, chunk size, number of weights
+WEIGHT = struct.Struct("<Bd")  # Event code and weight
+OVERRIDE = struct.Struct("<IIB")  # Row, column and event code of a room changed after generation
+POSITION = struct.Struct("<II")  # POSN section: the player's row and column
+STATS = struct.Struct("<5i")  # Health, defense, dodge, level and experience
+COUNT = struct.Struct("<I")
+GOLD = struct.Struct("<q")
+VALUE = struct.Struct("<i")
+STRING_LENGTH = struct.Struct("<H")  # Length of the UTF-8 bytes of a string
+ITEM_CODE = struct.Struct("<B")  # Index of an item's class in ITEM_CLASSES, 0xff for no item
+
+
+class SaveFile:
+    """
+    A save game on disk, in a compact versioned binary format.
+
+    The file is a header followed by tagged sections: the dungeon (GRID with the raw event codes, or CHNK with
+    the seed and changed rooms of a ChunkedDungeon), the player's position (POSN), the player (PLYR) and their
+    inventory (INVT), ending with END. Readers skip sections they do not know, so later versions can add sections.
+
+    The event grid is written straight from the dungeon's storage and is always the first section. After a save,
+    the SaveFile remembers the grid it wrote, so the next save of the same dungeon only rewrites the blocks of the
+    grid that changed and the small sections after it. Those patches are first written to a journal next to the
+    save, ending with a commit marker, and only then applied to the save. A crash while writing the journal
+    leaves the previous save intact, and a crash while applying it is finished by the next save() or load().
+    Saves can be written on a worker thread, see save().
+    """
+    def __init__(self, path):
+        """
+        Initializes a save file at path. Nothing is read or written until save() or load().
+        """
+        self.path = path
+        self.journal_path = path + ".journal"  # Patches of a delta save, until they are applied to the save
+        self.grid = None  # The event grid last written or read, for delta saves
+        self.grid_offset = None  # Position of the event codes in the file
+        self.kind = None  # Dungeon kind of the last save
+        self.stamp = None  # Size and modification time of the file after the last save, to detect outside changes
+        self.executor = None  # Worker thread writing background saves, created by the first one
+        self.pending = None  # Future of the background save being written
+
+    def save(self, dungeon, position, player, background=False):
+        """
+        Saves the dungeon, the player's position and the player. Only the changes since the last save are written
+        when possible. Returns the number of bytes written.
+
+        With background=True the save is encoded right away but written to disk on a worker thread, so the
+        caller does not wait for the disk. A failure of that write is raised by the next save() or load().
+        """
+        self.wait()
+        self.recover()
+        kind = DUNGEON_KINDS.index(type(dungeon))
+        if kind != DUNGEON_KINDS.index(ChunkedDungeon) and self.can_patch(kind, dungeon.size):
+            return self.write_delta(dungeon, position, player, background)
+        return self.write_full(dungeon, position, player, background)
+
+    def can_patch(self, kind, size):
+        """
+        Returns True if the file still holds the last save of a dungeon of this kind and size.
+        """
+        return (self.grid is not None and self.kind == kind and len(self.grid) == size * size
+                and file_stamp(self.path) == self.stamp)
+
+    def wait(self):
+        """
+        Waits for a save being written on the worker thread, raising the error it failed with, if any.
+        """
+        pending, self.pending = self.pending, None
+        if pending is not None:
+            pending.result()
+
+    def run(self, write, background):
+        """
+        Calls write() on the worker thread if background is True, or right away. A failed write forgets the grid
+        of the last save, so the next save is a full one.
+        """
+        def guarded():
+            try:
+                write()
+            except BaseException:
+                self.grid = None
+                raise
+        if not background:
+            guarded()
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="save")
+        self.pending = self.executor.submit(guarded)
+
+    def write_full(self, dungeon, position, player, background=False):
+        """
+        Writes a complete save to a temporary file, waits until it is on disk and moves it over the save, so
+        a crash never leaves a half written save. Returns the number of bytes written.
+        """
+        self.wait()
+        kind = DUNGEON_KINDS.index(type(dungeon))
+        tail = encode_tail(position, player)  # Encoded first, so a player that cannot be saved leaves no trace
+        parts = [SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, kind)]
+        if isinstance(dungeon, ChunkedDungeon):
+            parts.append(encode_section(b"CHNK", encode_chunked(dungeon)))
+            grid = None
+        else:
+            grid = bytes(dungeon.event_grid())
+            parts.append(SECTION_HEADER.pack(b"GRID", GRID.size + len(grid)) + GRID.pack(dungeon.size))
+            self.grid_offset = sum(len(part) for part in parts)
+            parts.append(grid)
+        parts.append(tail)
+        self.grid = grid
+        self.kind = kind
+
+        def write():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = self.path + ".tmp"
+            with open(temporary, "wb") as file:
+                file.writelines(parts)
+                file.flush()
+                os.fsync(file.fileno())
+            remove_file(self.journal_path)  # A leftover journal patches the previous save, never this one
+            os.replace(temporary, self.path)
+            self.stamp = file_stamp(self.path)
+        self.run(write, background)
+        return sum(len(part) for part in parts)
+
+    def write_delta(self, dungeon, position, player, background=False):
+        """
+        Rewrites the blocks of the event grid that changed since the last save and the sections after the grid,
+        going through the journal. Returns the number of bytes written to the save.
+        """
+        tail = encode_tail(position, player)
+        grid = dungeon.event_grid()
+        patches = []
+        for start in range(0, len(grid) if grid != self.grid else 0, SAVE_BLOCK_SIZE):
+            block = grid[start:start + SAVE_BLOCK_SIZE]  # Slices of bytes compare far faster than memoryviews
+            if block != self.grid[start:start + SAVE_BLOCK_SIZE]:
+                patches.append((self.grid_offset + start, block))
+        patches.append((self.grid_offset + len(grid), tail))
+        length = self.grid_offset + len(grid) + len(tail)
+        self.grid = bytes(grid)
+
+        def write():
+            write_journal(self.journal_path, patches, length)
+            apply_patches(self.path, patches, length)
+            remove_file(self.journal_path)
+            self.stamp = file_stamp(self.path)
+        self.run(write, background)
+        return sum(len(data) for _, data in patches)
+
+    def recover(self):
+        """
+        Finishes or drops a delta save interrupted by a crash. A journal with its commit marker is applied to
+        the save; a journal cut short is deleted, leaving the save as it was before that delta save.
+        """
+        journal = read_journal(self.journal_path)
+        if journal is not None:
+            apply_patches(self.path, *journal)
+        remove_file(self.journal_path)
+
+    def load(self):
+        """
+        Loads the save. Raises ValueError if it is not a save of this version, is cut short, or lacks the dungeon
+        or the player's position.
+
+        Returns:
+            (dungeon, position, player): The dungeon, of the class it was saved from, the player's (row, column)
+                and the Player, or None if no player was saved.
+        """
+        self.wait()
+        self.recover()
+        with open(self.path, "rb") as file:
+            header = file.read(SAVE_HEADER.size)
+            if len(header) < SAVE_HEADER.size:
+                raise ValueError(f"{self.path} is cut short.")
+            magic, version, kind = SAVE_HEADER.unpack(header)
+            if magic != SAVE_MAGIC or version != SAVE_VERSION:
+                raise ValueError(f"{self.path} is not a version {SAVE_VERSION} save.")
+            dungeon = position = player = grid = None
+            self.grid = None  # Until the save loaded, so a failed load is never patched
+            while True:
+                header = file.read(SECTION_HEADER.size)
+                if len(header) < SECTION_HEADER.size:
+                    raise ValueError(f"{self.path} is cut short.")
+                tag, length = SECTION_HEADER.unpack(header)
+                if tag == b"END ":
+                    break
+                if tag == b"GRID":
+                    size, = GRID.unpack(file.read(GRID.size))
+                    self.grid_offset = file.tell()
+                    events = bytearray(length - GRID.size)
+                    if file.readinto(events) != len(events) or len(events) != size * size:
+                        raise ValueError(f"{self.path} is cut short.")
+                    grid = bytes(events)
+                    dungeon = decode_grid(DUNGEON_KINDS[kind], size, events)
+                    continue
+                payload = file.read(length)
+                if len(payload) < length:
+                    raise ValueError(f"{self.path} is cut short.")
+                if tag == b"CHNK":
+                    dungeon = decode_chunked(payload)
+                elif tag == b"POSN":
+                    position = POSITION.unpack(payload)
+                elif tag == b"PLYR":
+                    player = decode_player(payload)
+                elif tag == b"INVT" and player is not None:
+                    decode_inventory(payload, player.inventory)
+                    if player.weapon is not None:
+                        # Equip the inventory's copy of the weapon rather than the saved one
+                        player.weapon = player.inventory.find(player.weapon.name, 'weapon') or player.weapon
+        if dungeon is None or position is None:
+            raise ValueError(f"{self.path} has no dungeon or no position.")
+        self.grid = grid
+        self.kind = kind
+        self.stamp = file_stamp(self.path)
+        return dungeon, position, player
+
+
+def save_game(path, dungeon, position, player):
+    """
+    Writes a complete save of the game at path. Returns the number of bytes written.
+    """
+    return SaveFile(path).write_full(dungeon, position, player)
+
+
+def load_game(path):
+    """
+    Loads the save at path and returns (dungeon, position, player).
+    """
+    return SaveFile(path).load()
+
+
+def file_stamp(path):
+    """
+    Returns the size and modification time of a file, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def remove_file(path):
+    """
+    Deletes a file if it exists.
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_journal(path, patches, length):
+    """
+    Writes patches, as (position, bytes) pairs, and the length of the patched save to a journal, ending with
+    a commit marker holding a checksum of the patches, and waits until it is on disk.
+    """
+    body = b"".join(JOURNAL_PATCH.pack(position, len(data)) + data for position, data in patches)
+    with open(path, "wb") as file:
+        file.write(JOURNAL_MAGIC)
+        file.write(body)
+        file.write(JOURNAL_COMMIT.pack(b"DONE", length, zlib.crc32(body)))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_journal(path):
+    """
+    Reads a journal written by write_journal. Returns (patches, length), or None if there is no journal or
+    it was cut short before its commit marker.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < len(JOURNAL_MAGIC) + JOURNAL_COMMIT.size or not data.startswith(JOURNAL_MAGIC):
+        return None
+    tag, length, checksum = JOURNAL_COMMIT.unpack_from(data, len(data) - JOURNAL_COMMIT.size)
+    body = data[len(JOURNAL_MAGIC):len(data) - JOURNAL_COMMIT.size]
+    if tag != b"DONE" or zlib.crc32(body) != checksum:
+        return None
+    patches = []
+    offset = 0
+    while offset < len(body):
+        position, size = JOURNAL_PATCH.unpack_from(body, offset)
+        offset += JOURNAL_PATCH.size
+        patches.append((position, body[offset:offset + size]))
+        offset += size
+    return patches, length
+
+
+def apply_patches(path, patches, length):
+    """
+    Writes patches, as (position, bytes) pairs, into a file, cuts it to length and waits until it is on disk.
+    Applying the same patches again gives the same file, so an interrupted journal can simply be replayed.
+    """
+    with open(path, "r+b") as file:
+        for position, data in patches:
+            file.seek(position)
+            file.write(data)
+        file.truncate(length)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def encode_tail(position, player):
+    """
+    Returns the sections after the dungeon: position, player, inventory and the end marker.
+    """
+    sections = [encode_section(b"POSN", POSITION.pack(*position))]
+    if player is not None:
+        sections.append(encode_section(b"PLYR", encode_player(player)))
+        sections.append(encode_section(b"INVT", encode_inventory(player.inventory)))
+    sections.append(encode_section(b"END ", b""))
+    return b"".join(sections)
+
+
+def encode_section(tag, payload):
+    """
+    Returns a section with its tag and length.
+    """
+    return SECTION_HEADER.pack(tag, len(payload)) + payload
+
+
+class Reader:
+    """
+    Reads values one after another from a section's payload.
+    """
+    def __init__(self, payload):
+        self.payload = payload  # The section's bytes
+        self.offset = 0  # Position of the next value
+
+    def unpack(self, layout):
+        """
+        Reads the values of a struct layout.
+        """
+        values = layout.unpack_from(self.payload, self.offset)
+        self.offset += layout.size
+        return values
+
+    def string(self):
+        """
+        Reads a string written by encode_string.
+        """
+        length, = self.unpack(STRING_LENGTH)
+        text = bytes(self.payload[self.offset:self.offset + length]).decode("utf-8")
+        self.offset += length
+        return text
+
+
+def encode_string(text):
+    """
+    Returns text as UTF-8 bytes preceded by their length.
+    """
+    encoded = text.encode("utf-8")
+    return STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+def decode_grid(cls, size, events):
+    """
+    Rebuilds a Dungeon or CompactDungeon from its event codes.
+    """
+    if cls is CompactDungeon:
+        return CompactDungeon(size, events=events)
+    dungeon = Dungeon(size, generate=False)
+    dungeon.load_events(events)
+    return dungeon
+
+
+def encode_chunked(dungeon):
+    """
+    Returns the payload of a CHNK section. A chunked dungeon is saved as its seed and the rooms changed after
+    generation, since every other room is regenerated identically from the seed.
+    """
+    weights = sorted((EVENT_CODES[event], weight) for event, weight in (dungeon.weights or {}).items())
+    parts = [CHUNKED.pack(dungeon.seed, dungeon.size, dungeon.chunk_size, len(weights))]
+    parts.extend(WEIGHT.pack(code, weight) for code, weight in weights)
+    overrides = list(dungeon.iter_overrides())
+    parts.append(COUNT.pack(len(overrides)))
+    parts.extend(OVERRIDE.pack(i, j, code) for i, j, code in overrides)
+    return b"".join(parts)
+
+
+def decode_chunked(payload):
+    """
+    Rebuilds a ChunkedDungeon from the payload of a CHNK section.
+    """
+    reader = Reader(payload)
+    seed, size, chunk_size, weight_count = reader.unpack(CHUNKED)
+    weights = dict(reader.unpack(WEIGHT) for _ in range(weight_count))
+    weights = {EVENTS[code]: weight for code, weight in weights.items()} or None
+    dungeon = ChunkedDungeon(size, seed, weights, chunk_size)
+    count, = reader.unpack(COUNT)
+    for _ in range(count):
+        i, j, code = reader.unpack(OVERRIDE)
+        dungeon.set_event(i, j, EVENTS[code])
+    return dungeon
+
+
+def encode_item(item):
+    """
+    Returns an item record: the item's class code, name, description and damage (0 for consumables),
+    followed for consumables by the name their effect is registered under.
+    Raises ValueError for a consumable whose effect is not registered, since it could not be restored.
+    """
+    code = ITEM_CLASSES.index(type(item))
+    value = item.damage if isinstance(item, Weapon) else 0
+    record = bytes((code,)) + encode_string(item.name) + encode_string(item.description) + VALUE.pack(value)
+    if isinstance(item, Consumable):
+        effect_name = getattr(item.effect, "effect_name", None)
+        if effect_name is None or EFFECTS.get(effect_name) is not item.effect:
+            raise ValueError(f"The effect of {item.name} is not registered and cannot be saved.")
+        record += encode_string(effect_name)
+    return record
+
+
+def decode_item(reader):
+    """
+    Reads an item record.
+    """
+    code = reader.unpack(ITEM_CODE)[0]
+    name = reader.string()
+    description = reader.string()
+    value, = reader.unpack(VALUE)
+    if ITEM_CLASSES[code] is Weapon:
+        return Weapon(name, description, value)
+    effect_name = reader.string()
+    if effect_name not in EFFECTS:
+        raise ValueError(f"Unknown consumable effect '{effect_name}'.")
+    return Consumable(name, description, EFFECTS[effect_name])
+
+
+def encode_player(player):
+    """
+    Returns the payload of a PLYR section: class name, name, stats, the attributes of the player's class
+    and the equipped weapon.
+    """
+    cls = type(player)
+    extra = [getattr(player, name) for name in cls.__slots__]
+    parts = [
+        encode_string(cls.__name__),
+        encode_string(player.name),
+        STATS.pack(player.health, player.defense, player.dodge, player.level, player.exp),
+        COUNT.pack(len(extra)),
+    ]
+    parts.extend(VALUE.pack(value) for value in extra)
+    parts.append(encode_item(player.weapon) if player.weapon is not None else b"\xff")
+    return b"".join(parts)
+
+
+def decode_player(payload):
+    """
+    Rebuilds a Player from the payload of a PLYR section.
+    """
+    reader = Reader(payload)
+    cls = PLAYER_CLASSES[reader.string()]
+    player = cls(reader.string())
+    player.health, player.defense, player.dodge, player.level, player.exp = reader.unpack(STATS)
+    count, = reader.unpack(COUNT)
+    for name in cls.__slots__[:count]:
+        setattr(player, name, reader.unpack(VALUE)[0])
+    if payload[reader.offset] != 0xff:
+        player.weapon = decode_item(reader)
+    return player
+
+
+def encode_inventory(inventory):
+    """
+    Returns the payload of an INVT section: the gold total and a record of every other item.
+    """
+    items = [item for named in inventory.instances.values() for same in named.values() for item in same]
+    return b"".join([GOLD.pack(inventory.gold), COUNT.pack(len(items))] + [encode_item(item) for item in items])
+
+
+def decode_inventory(payload, inventory):
+    """
+    Fills an inventory from the payload of an INVT section.
+    """
+    reader = Reader(payload)
+    gold, = reader.unpack(GOLD)
+    count, = reader.unpack(COUNT)
+    inventory.add_items(decode_item(reader) for _ in range(count))
+    if gold:
+        inventory.add_item(Gold(gold))
@@ -0,0 +1,255 @@
+"""
+Headless batch simulation of dungeon runs for balancing.
+Runs only use event grids and game logic, never Room or pygame, so they can run by the thousand in worker processes.
+Run with: python mightandmagic simulate [--class Rogue] [--runs N] [--size N] [--policy exit|safe|random] [--workers N]
+"""
+import argparse
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from constants import (
+    DUNGEON_SIZE,
+    EVENT_CODES,
+    EVENTS,
+    SIMULATION_DAMAGE,
+    SIMULATION_MAX_STEPS_PER_ROOM,
+    SIMULATION_TREASURE_GOLD,
+)
+from generation import derive_seed, generate_events
+from inventory import Gold
+from navigation import DIRECTION_NAMES, NavigationIndex
+from player import Rogue, Warrior, Wizard
+
+PLAYER_CLASSES = {cls.__name__: cls for cls in (Rogue, Wizard, Warrior)}
+
+
+class SimulatedDungeon:
+    """
+    The event grid of a dungeon with just enough of the Dungeon interface for a NavigationIndex.
+    """
+    def __init__(self, size, events):
+        self.size = size
+        self.events = events  # One event code per room, row by row
+        self.listeners = []  # Callbacks told about rooms whose event changed
+
+    def event_grid(self):
+        return self.events
+
+    def event_at(self, i, j):
+        return EVENTS[self.events[i * self.size + j]]
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def set_event(self, i, j, event):
+        self.events[i * self.size + j] = EVENT_CODES[event]
+        for listener in self.listeners:
+            listener(i, j)
+
+
+class Run:
+    """
+    The state of one simulated run, handed to the policy to choose each move.
+    """
+    def __init__(self, player, dungeon, rng):
+        self.player = player  # The simulated Player
+        self.dungeon = dungeon  # The SimulatedDungeon being explored
+        self.rng = rng  # The run's random generator; policies must only use this one
+        self.position = (0, 0)  # The player's row and column
+        self.steps = 0  # Moves made so far
+        self.damage_taken = 0  # Health lost so far
+        self.navigation = None  # NavigationIndex over the dungeon, built on first use by policies that need it
+        self.safe_navigation = None  # NavigationIndex avoiding damaging rooms, built on first use by the safe policy
+
+    def moves(self):
+        """
+        Returns the directions the player can move in and the positions they lead to.
+        """
+        i, j = self.position
+        size = self.dungeon.size
+        candidates = ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1))
+        return [
+            (direction, (row, column))
+            for direction, (row, column) in zip(DIRECTION_NAMES, candidates)
+            if 0 <= row < size and 0 <= column < size
+        ]
+
+
+def random_walk(run):
+    """
+    A policy moving in a random direction every step.
+    """
+    return run.rng.choice(run.moves())[0]
+
+
+def exit_seeking(run):
+    """
+    A policy following a shortest path to the exit.
+    """
+    if run.navigation is None:
+        run.navigation = NavigationIndex(run.dungeon)
+    return run.navigation.next_step_to_exit(*run.position)
+
+
+def safe_exit_seeking(run):
+    """
+    A policy following a shortest path to the exit through rooms that deal no damage, and a shortest path
+    through any room when the exit cannot be reached safely. Emptied rooms open up new paths as the run goes.
+    """
+    if run.safe_navigation is None:
+        run.safe_navigation = NavigationIndex(run.dungeon, SIMULATION_DAMAGE)
+    return run.safe_navigation.next_step_to_exit(*run.position) or exit_seeking(run)
+
+
+POLICIES = {"exit": exit_seeking, "safe": safe_exit_seeking, "random": random_walk}
+
+
+def resolve_event(run, event):
+    """
+    Applies the event of the room the player entered. Traps and encounters deal damage, treasure gives gold,
+    and the room is emptied so an event only triggers once.
+    """
+    player = run.player
+    if event in SIMULATION_DAMAGE:
+        health = player.health
+        player.take_damage(run.rng.randint(*SIMULATION_DAMAGE[event]))
+        run.damage_taken += health - player.health
+    elif event == 'treasure':
+        player.inventory.add_item(Gold(run.rng.randint(*SIMULATION_TREASURE_GOLD)))
+    if event != 'exit':
+        run.dungeon.set_event(*run.position, 'empty')
+
+
+def simulate_run(player_class, size, seed, policy=exit_seeking, weights=None, max_steps=None):
+    """
+    Simulates one run of a player through a dungeon generated from seed, moving as the policy decides.
+
+    Returns:
+        dict: reached_exit, died, steps, damage_taken, health and gold at the end of the run.
+    """
+    dungeon = SimulatedDungeon(size, generate_events(size, seed, weights))
+    run = Run(player_class(player_class.__name__), dungeon, random.Random(derive_seed(seed, "run")))
+    max_steps = size * size * SIMULATION_MAX_STEPS_PER_ROOM if max_steps is None else max_steps
+    reached_exit = False
+    while True:
+        event = dungeon.event_at(*run.position)
+        resolve_event(run, event)
+        if event == 'exit':
+            reached_exit = True
+            break
+        if run.player.health <= 0 or run.steps >= max_steps:
+            break
+        direction = policy(run)
+        if direction is None:
+            break
+        run.position = dict(run.moves())[direction]
+        run.steps += 1
+    return {
+        "reached_exit": reached_exit,
+        "died": run.player.health <= 0,
+        "steps": run.steps,
+        "damage_taken": run.damage_taken,
+        "health": run.player.health,
+        "gold": run.player.inventory.gold,
+    }
+
+
+def empty_totals():
+    """
+    Returns zeroed totals for add_run and merge_totals.
+    """
+    return {"runs": 0, "reached_exit": 0, "died": 0, "steps": 0, "damage_taken": 0, "max_damage_taken": 0, "gold": 0}
+
+
+def add_run(totals, result):
+    """
+    Adds the result of one run to running totals.
+    """
+    totals["runs"] += 1
+    totals["reached_exit"] += result["reached_exit"]
+    totals["died"] += result["died"]
+    totals["steps"] += result["steps"]
+    totals["damage_taken"] += result["damage_taken"]
+    totals["max_damage_taken"] = max(totals["max_damage_taken"], result["damage_taken"])
+    totals["gold"] += result["gold"]
+
+
+def merge_totals(totals, other):
+    """
+    Adds the totals of another batch to totals.
+    """
+    for name, value in other.items():
+        if name == "max_damage_taken":
+            totals[name] = max(totals[name], value)
+        else:
+            totals[name] += value
+
+
+def simulate_slice(player_class, first_run, runs, size, seed, policy, weights):
+    """
+    Simulates runs first_run to first_run + runs - 1 and returns their totals.
+    Every run is seeded from the batch seed and its own number, so results do not depend on how runs are
+    split between workers.
+    """
+    totals = empty_totals()
+    for number in range(first_run, first_run + runs):
+        add_run(totals, simulate_run(player_class, size, derive_seed(seed, number), policy, weights))
+    return totals
+
+
+def run_batch(player_class, runs, size=DUNGEON_SIZE, seed=0, policy=exit_seeking, weights=None, workers=None):
+    """
+    Simulates runs of a player class split evenly across a pool of worker processes and aggregates the results.
+    With workers=1 the runs are simulated in this process.
+
+    Returns:
+        dict: The number of runs, exit reach rate, death rate and mean steps, damage taken and gold per run,
+            and the most damage taken in a single run.
+    """
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, runs))
+    bounds = [runs * worker // workers for worker in range(workers + 1)]
+    slices = [(player_class, bounds[k], bounds[k + 1] - bounds[k], size, seed, policy, weights) for k in range(workers)]
+    totals = empty_totals()
+    if workers == 1:
+        merge_totals(totals, simulate_slice(*slices[0]))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for partial in pool.map(simulate_slice, *zip(*slices)):
+                merge_totals(totals, partial)
+    count = max(totals["runs"], 1)
+    return {
+        "runs": totals["runs"],
+        "exit_rate": totals["reached_exit"] / count,
+        "death_rate": totals["died"] / count,
+        "mean_steps": totals["steps"] / count,
+        "mean_damage_taken": totals["damage_taken"] / count,
+        "max_damage_taken": totals["max_damage_taken"],
+        "mean_gold": totals["gold"] / count,
+    }
+
+
+def main(argv):
+    """
+    Runs a simulation batch from the command line and prints its statistics.
+    """
+    parser = argparse.ArgumentParser(prog="mightandmagic simulate", description="Simulate dungeon runs in parallel.")
+    parser.add_argument("--class", dest="player_class", choices=list(PLAYER_CLASSES), default="Rogue")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=DUNGEON_SIZE)
+    parser.add_argument("--policy", choices=list(POLICIES), default="exit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+    stats = run_batch(
+        PLAYER_CLASSES[args.player_class], args.runs, args.size, args.seed, POLICIES[args.policy], workers=args.workers
+    )
+    for name, value in stats.items():
+        print(f"{name:<20} {value:.4f}" if isinstance(value, float) else f"{name:<20} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,17 +1,42 @@
+import inspect
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
 import pygame
-import time
 from constants import (
+    AUTO_WALK_AVOIDED_EVENTS,
+    AUTO_WALK_STEPS,
+    AUTOSAVE_MOVES,
+    AUTOSAVE_NAME,
+    BUTTON_BG_IMAGE,
     CHARACTER_SELECT_BG,
+    DEBUG,
+    DUNGEON_SIZE,
+    INTRO_BG_IMAGE_PATH,
+    INTRO_DURATION,
+    LOADING_STEPS_PER_UPDATE,
     MAIN_MENU_BG,
-    NEW_GAME_BUTTON_IMAGE_PATH,
-    OPTIONS_BUTTON_IMAGE_PATH,
-    QUIT_BUTTON_IMAGE_PATH,
+    MINIMAP_POS,
+    ROOM_DESCRIPTION_RECT,
+    SAVE_DIR,
+    SAVE_NAME,
     SCREEN_HEIGHT,
     SCREEN_WIDTH,
+    UPDATE_RATE,
+    WHITE,
 )
-from dungeon import Dungeon
+from compositor import Compositor
+from input_router import InputRouter
+from metrics import metrics
+from minimap import Minimap
+from navigation import NavigationIndex
+from dungeon import ChunkedDungeon, new_dungeon
 from player import Rogue, Warrior, Wizard
+from savegame import SaveFile
+from text import render_text
 from utils import BottomUI, Button, image_loader
+from viewport import Viewport
 
 
 class State:
@@ -24,12 +49,15 @@ class State:
         Initializes the screen.
         """
         self.screen = screen
+        self.needs_redraw = True  # Whether the next draw must repaint the whole screen
+        self.router = InputRouter()  # Dispatches clicks and key presses to the state's callbacks
 
     def handle_input(self, event):
         """
-        Method to handle user input. To be implemented in subclasses.
+        Method to handle user input. Dispatches the event through the state's router and returns the result of
+        the callback it calls, e.g. the state to switch to.
         """
-        pass
+        return self.router.dispatch(event)
 
     def update(self):
         """
@@ -40,9 +68,23 @@ class State:
     def draw(self, screen):
         """
         Method to draw the game state to the screen. To be implemented in subclasses.
+        Returns the list of rects that changed, or None if the whole screen should be presented.
         """
         pass
 
+    def invalidate(self, rect=None):
+        """
+        Requests a repaint of the whole screen on the next draw, e.g. after the window was exposed.
+        States that repaint regions of the screen may only repaint rect when one is given.
+        """
+        self.needs_redraw = True
+
+    def is_static(self):
+        """
+        Returns True if the state only changes in response to input, so the main loop may sleep until an event arrives.
+        """
+        return False
+
 
 class IntroState(State):
     """
@@ -51,27 +93,40 @@ class IntroState(State):
 
     def __init__(self, screen):
         """
-        Initializes the start time of the intro state.
+        Initializes the elapsed logic steps of the intro state.
         """
         super().__init__(screen)
-        self.start_time = time.time()
+        self.background_image = image_loader(INTRO_BG_IMAGE_PATH, with_alpha=False, scale=True)
+        self.ticks = 0  # Logic steps since the intro started
+        # If the user presses return or escape, transition to the main menu state
+        self.router.bind_key(pygame.K_RETURN, self.skip)
+        self.router.bind_key(pygame.K_ESCAPE, self.skip)
 
-    def handle_input(self, event):
+    def skip(self):
         """
-        Handles user input in the intro state. If the user presses return or escape, transition to the main menu state.
+        Skips the intro, transitioning to the main menu state.
         """
-        if event.type == pygame.KEYDOWN and (
-            event.key == pygame.K_RETURN or event.key == pygame.K_ESCAPE
-        ):
-            return MainMenuState()
+        return MainMenuState(self.screen)
 
     def update(self):
         """
-        Updates the intro state. If 3 seconds have passed, transition to the main menu state.
+        Updates the intro state. If INTRO_DURATION seconds of logic steps have passed, transition to the main menu state.
         """
-        if time.time() - self.start_time > 3:  # 3 seconds have passed
+        self.ticks += 1
+        if self.ticks >= INTRO_DURATION * UPDATE_RATE:
             return MainMenuState(self.screen)
 
+    def draw(self, screen):
+        """
+        Draws the intro background once; nothing changes afterwards.
+        """
+        if not self.needs_redraw:
+            return []
+        self.needs_redraw = False
+        screen.blit(self.background_image, (0, 0))
+        metrics.count("blits")
+        return None
+
 
 class MainMenuState(State):
     """
@@ -86,55 +141,59 @@ class MainMenuState(State):
         self.background_image = image_loader(MAIN_MENU_BG, with_alpha=False, scale=True)
         self.buttons = [
             Button(
-                "buttonBG.jpg",
+                BUTTON_BG_IMAGE,
                 SCREEN_WIDTH / 2,
                 SCREEN_HEIGHT / 2 - 100,
                 180,
                 70,
                 "New Game",
+                lambda: CharacterSelectState(self.screen),
             ),
             Button(
-                "buttonBG.jpg",
+                BUTTON_BG_IMAGE,
                 SCREEN_WIDTH / 2,
                 SCREEN_HEIGHT / 2,
                 180,
                 70,
                 "Options",
+                OptionsState,
             ),
             Button(
-                "buttonBG.jpg",
+                BUTTON_BG_IMAGE,
                 SCREEN_WIDTH / 2,
                 SCREEN_HEIGHT / 2 + 100,
                 180,
                 70,
                 "Quit",
+                QuitState,
             ),
         ]
+        for button in self.buttons:
+            self.router.add(button)
 
-    def handle_input(self, event):
+    def is_static(self):
         """
-        Handles user input in the main menu state. Only responds to mouse events.
+        The main menu only changes in response to input.
         """
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            for button in self.buttons:
-                if button.is_clicked(event):
-                    if button.text == "New Game":
-                        return CharacterSelectState(self.screen)
-                    elif button.text == "Options":
-                        return OptionsState()
-                    elif button.text == "Quit":
-                        return QuitState()
+        return True
 
     def draw(self, screen):
         """
         Draws the main menu state to the screen.
+        The screen only changes when the state is first shown or invalidated.
         """
+        if not self.needs_redraw:
+            return []
+        self.needs_redraw = False
+
         # Draw the background image
         screen.blit(self.background_image, (0, 0))
+        metrics.count("blits")
 
         # Draw the buttons
         for button in self.buttons:
             button.draw(screen)
+        return None
 
 
 class CharacterSelectState(State):
@@ -152,123 +211,409 @@ class CharacterSelectState(State):
         )
         self.buttons = [
             Button(
-                "buttonBG.jpg",
+                BUTTON_BG_IMAGE,
                 SCREEN_WIDTH * 0.01, SCREEN_HEIGHT * 0.83,
                 180,
                 70,
                 "Rogue",
+                lambda: self.select(Rogue),
             ),
             Button(
-                "buttonBG.jpg",
+                BUTTON_BG_IMAGE,
                 SCREEN_WIDTH * 0.395, SCREEN_HEIGHT * 0.83,
                 180,
                 70,
                 "Wizard",
+                lambda: self.select(Wizard),
             ),
             Button(
-                "buttonBG.jpg",
+                BUTTON_BG_IMAGE,
                 SCREEN_WIDTH * 0.765, SCREEN_HEIGHT * 0.83,
                 180,
                 70,
                 "Warrior",
+                lambda: self.select(Warrior),
             ),
-           
         ]
-        self.selected_player = None  # Attribute to store the selected player character
-
-        # Load images for all buttons
         for button in self.buttons:
-            button.load_image()
+            self.router.add(button)
+        self.selected_player = None  # Attribute to store the selected player character
 
-    def handle_input(self, event):
+    def select(self, player_class):
         """
-        Handles user input in the character selection state. Depending on the button clicked, transition to the new game state.
+        Creates a player of the selected class and transitions to the new game state.
         """
-        for button in self.buttons:
-            if button.is_clicked(event):
+        self.selected_player = player_class(player_class.__name__)
+        return LoadingState(self.screen, NewGameState.build(self.screen, self.selected_player))
 
-                # Create a Player object based on the selected character
-                if button.image_path == NEW_GAME_BUTTON_IMAGE_PATH:
-                    self.selected_player = Rogue("Rogue")  # Create a Rogue player
-                elif button.image_path == OPTIONS_BUTTON_IMAGE_PATH:
-                    self.selected_player = Wizard("Wizard")  # Create a Wizard player
-                elif button.image_path == QUIT_BUTTON_IMAGE_PATH:
-                    self.selected_player = Warrior("Warrior")  # Create a Warrior player
-                return NewGameState(self.screen, self.selected_player)
+    def is_static(self):
+        """
+        The character selection only changes in response to input.
+        """
+        return True
 
     def draw(self, screen):
         """
         Draws the character selection state to the screen.
+        The screen only changes when the state is first shown or invalidated.
         """
+        if not self.needs_redraw:
+            return []
+        self.needs_redraw = False
+
         # Draw the background image
         screen.blit(self.background_image, (0, 0))
+        metrics.count("blits")
 
         # Draw the buttons
         for button in self.buttons:
             button.draw(screen)
+        return None
+
+
+class LoadingState(State):
+    """
+    Represents a loading screen shown while the next state is prepared.
+    The screen keeps rendering and the main loop keeps pumping events however long the preparation takes.
+    """
+
+    def __init__(self, screen, build):
+        """
+        Starts preparing the next state. build is either a generator, which is advanced LOADING_STEPS_PER_UPDATE
+        times per logic step, yields its progress from 0 to 1 and returns the next state, or a callable returning
+        the next state, which is run on a worker thread.
+
+        A generator finishes on the same logic step on every machine, so replays reach the next state on the
+        same frame. The worker thread finishes whenever it does, so callables are only for preparations that
+        are not recorded.
+        """
+        super().__init__(screen)
+        self.progress = 0.0  # Fraction of the preparation done
+        self.bar_rect = pygame.Rect(SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2, SCREEN_WIDTH // 2, 24)  # Outline of the progress bar
+        self.drawn_progress = None  # Progress shown by the last draw
+        self.steps = None  # Generator preparing the next state incrementally
+        self.future = None  # Future of the next state prepared on a worker thread
+        if inspect.isgenerator(build):
+            self.steps = build
+        else:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="loading")
+            self.future = executor.submit(build)
+            executor.shutdown(wait=False)
+
+    def update(self):
+        """
+        Advances the preparation and transitions to the next state once it is ready.
+        """
+        if self.steps is not None:
+            try:
+                for _ in range(LOADING_STEPS_PER_UPDATE):
+                    progress = next(self.steps)
+                    if progress is not None:
+                        self.progress = progress
+            except StopIteration as finished:
+                return finished.value
+        elif self.future.done():
+            return self.future.result()
+
+    def draw(self, screen):
+        """
+        Draws the loading screen. After the first draw only the progress bar is repainted, when it changes.
+        """
+        dirty = []
+        if self.needs_redraw:
+            self.needs_redraw = False
+            self.drawn_progress = None
+            screen.fill((0, 0, 0))
+            text = render_text("Loading...", 36, WHITE)
+            screen.blit(text, text.get_rect(midbottom=(SCREEN_WIDTH // 2, self.bar_rect.top - 12)))
+            metrics.count("blits")
+            dirty.append(screen.get_rect())
+        if self.progress != self.drawn_progress:
+            self.drawn_progress = self.progress
+            filled = self.bar_rect.inflate(-4, -4)
+            filled.width = int(filled.width * min(max(self.progress, 0.0), 1.0))
+            screen.fill((0, 0, 0), self.bar_rect)
+            pygame.draw.rect(screen, WHITE, self.bar_rect, 1)
+            screen.fill(WHITE, filled)
+            dirty.append(self.bar_rect)
+        return dirty
 
 
 class NewGameState(State):
     """
     Represents the new game state of the game.
     """
+    dungeon_size = DUNGEON_SIZE  # Width and height in rooms of new dungeons, set with --dungeon-size
+    save_dir = SAVE_DIR  # Directory the quick save and autosave are written to, unless one is given
+    autosave_moves = AUTOSAVE_MOVES  # Rooms entered between autosaves, unless given; 0 turns autosaving off
 
-    def __init__(self, screen, character):
+    def __init__(self, screen, character, dungeon=None, save_dir=None, autosave_moves=None):
         """
         Initializes the dungeon, player position, and bottom UI in the new game state.
+        A new dungeon is generated unless one is given, see dungeon.new_dungeon.
+        Saves go to save_dir, and autosaves every autosave_moves rooms. Bench and replay set the class attributes
+        of the same names instead, since the game builds this state itself.
         """
         super().__init__(screen)
-        self.dungeon = Dungeon(6)
+        self.dungeon = new_dungeon(self.dungeon_size) if dungeon is None else dungeon
         self.player_position = (0, 0)
+        self.dungeon.visit(*self.player_position)
         self.character = character
         self.bottom_ui = BottomUI(screen)  # Pass the screen to the BottomUI constructor
+        self.save_dir = self.save_dir if save_dir is None else save_dir
+        self.autosave_moves = self.autosave_moves if autosave_moves is None else autosave_moves
+        self.save_file = SaveFile(os.path.join(self.save_dir, SAVE_NAME))  # Quick save; remembers the last save so later ones only write changes
+        self.autosave_file = SaveFile(os.path.join(self.save_dir, AUTOSAVE_NAME))  # Autosave, written as a delta of the previous autosave
+        self.moves = 0  # Rooms entered, to autosave every autosave_moves of them
+        self.router.bind_key(pygame.K_F5, self.quick_save)
+        self.router.bind_key(pygame.K_F9, self.quick_load)
+        self.router.bind_key(pygame.K_TAB, self.toggle_map)
+        self.router.bind_key(pygame.K_a, self.toggle_auto_walk)
+        for direction, button in self.bottom_ui.direction_buttons.items():
+            self.router.add(button, lambda direction=direction: self.move(direction))
+        self.compositor = Compositor()  # Keeps the layers of the screen and tracks which regions changed
+        self.compositor.add("room", None, (0, 0), z=0)
+        self.compositor.add("map", None, (0, 0), z=0).visible = False
+        self.compositor.add("room_description", None, ROOM_DESCRIPTION_RECT[:2], z=1)
+        self.compositor.add("bottom_ui", None, self.bottom_ui.rect.topleft, z=2)
+        self.minimap = Minimap(self.dungeon)  # Visited rooms under fog of war, repainted cell by cell
+        self.minimap.visit(*self.player_position)
+        self.compositor.add("minimap", self.minimap.surface, MINIMAP_POS, z=4)
+        self.dungeon.add_listener(self.refresh_room)
+        self.viewport = None  # Scrolling tiled view of the dungeon, built the first time the map is shown
+        self.map_view = False  # Whether the map is shown instead of the room
+        self.navigation = None  # Index over the dungeon for auto-walk, built the first time it is used
+        self.fallback_navigation = None  # Index through any room, for auto-walk when no safe path leads to the exit
+        self.auto_walk_wait = None  # Logic steps until the next auto-walk move, None while not auto-walking
         self.update_bottom_ui()  # Update the bottom UI initially
 
+    @classmethod
+    def build(cls, screen, character, size=None):
+        """
+        Builds a new game state step by step for a LoadingState, yielding the fraction done after each row of
+        the dungeon and returning the state. The dungeon is dungeon_size rooms wide unless size is given.
+        A ChunkedDungeon has nothing to generate up front.
+        """
+        dungeon = new_dungeon(cls.dungeon_size if size is None else size, generate=False)
+        if not isinstance(dungeon, ChunkedDungeon):
+            for progress in dungeon.iter_generate_rooms():
+                yield progress * 0.9
+        state = cls(screen, character, dungeon)
+        yield 1.0
+        return state
+
+    def current_room(self):
+        """
+        Returns the room the player is in.
+        """
+        return self.dungeon.rooms[self.player_position[0]][self.player_position[1]]
+
     def update_bottom_ui(self):
         """
         Updates the bottom UI based on the current room's information.
+        The buttons are kept; only the directions the room has exits in are enabled.
         """
-        current_room = self.dungeon.rooms[self.player_position[0]][self.player_position[1]]
+        current_room = self.current_room()
         self.bottom_ui.set_room_description(current_room.description)
-        self.bottom_ui.set_buttons()  # Set up buttons for directions
+        self.bottom_ui.set_directions(current_room.directions)
+        self.update_layers()
 
-    def handle_input(self, event):
+    def update_layers(self):
+        """
+        Points the compositor's layers at the current room and bottom UI. Only layers whose surfaces changed are redrawn.
         """
-        Handles user input in the new game state. Only responds to mouse events.
-        """
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            for button in self.bottom_ui.buttons:
-                if button.is_clicked(event):
-                    direction = button.text.lower()  # Convert button text to lowercase direction
-                    current_room = self.dungeon.rooms[self.player_position[0]][self.player_position[1]]
-                    if direction in current_room.directions:
-                        next_position = current_room.directions[direction]
-                        if 0 <= next_position[0] < self.dungeon.size and 0 <= next_position[1] < self.dungeon.size:
-                            self.player_position = next_position
-                            print(self.dungeon.print_dungeon())  # Print dungeon if moving
-                    else:
-                        print("Invalid direction.")
+        current_room = self.current_room()
+        self.compositor.set("room", current_room.image)
+        self.compositor.set("room_description", current_room.description_surface())
+        self.compositor.set("bottom_ui", self.bottom_ui.panel_surface())
+        for button in self.bottom_ui.buttons:
+            name = "button:" + button.text
+            if name in self.compositor.layers:
+                self.compositor.set(name, button.render(), button.rect.topleft)
+            else:
+                self.compositor.add(name, button.render(), button.rect.topleft, z=3)
 
-    def draw(self, screen):
+    def move(self, direction):
         """
-        Draws the new game state to the screen.
+        Moves the player to the adjacent room in the direction ('north', 'south', 'east' or 'west') if there is one.
+        Called by the direction buttons and auto-walk; F5 saves and F9 loads the game, TAB toggles the map
+        and A toggles auto-walk.
         """
-        # Clear the screen
-        screen.fill((0, 0, 0))
+        current_room = self.current_room()
+        if direction in current_room.directions:
+            next_position = current_room.directions[direction]
+            if 0 <= next_position[0] < self.dungeon.size and 0 <= next_position[1] < self.dungeon.size:
+                self.player_position = next_position
+                self.dungeon.visit(*next_position)
+                self.update_bottom_ui()
+                self.update_minimap()
+                if self.viewport is not None:
+                    self.viewport.follow(*self.player_position)
+                self.moves += 1
+                if self.autosave_moves and self.moves % self.autosave_moves == 0:
+                    self.autosave()
+                if DEBUG:
+                    self.dungeon.print_dungeon()
+        else:
+            print("Invalid direction.")
 
-        # Get the current room
-        current_room = self.dungeon.rooms[self.player_position[0]][
-            self.player_position[1]
-        ]
+    def update_minimap(self):
+        """
+        Marks the player's room as visited on the minimap and repaints the cells of the minimap that changed.
+        """
+        for rect in self.minimap.visit(*self.player_position):
+            self.compositor.invalidate(rect.move(MINIMAP_POS))
+
+    def refresh_room(self, i, j):
+        """
+        Repaints the room at row i, column j on the minimap after its event changed, and the room itself
+        if the player is in it.
+        """
+        rect = self.minimap.refresh_room(i, j)
+        if rect is not None:
+            self.compositor.invalidate(rect.move(MINIMAP_POS))
+        if (i, j) == self.player_position:
+            self.update_layers()
 
-        # Draw the room
-        current_room.display(screen)
+    def show_message(self, message):
+        """
+        Shows a message, e.g. the outcome of a save, on the bottom UI in place of the room description
+        until the player moves.
+        """
+        self.bottom_ui.set_room_description(message)
+        self.compositor.set("bottom_ui", self.bottom_ui.panel_surface())
 
-        # Draw bottom UI
-        self.bottom_ui.draw()
+    def quick_save(self):
+        """
+        Saves the dungeon, the player's position and the character to the quick save.
+        """
+        try:
+            self.save_file.save(self.dungeon, self.player_position, self.character)
+            self.show_message("Game saved.")
+        except (OSError, ValueError) as e:
+            self.show_message(f"Error saving game: {e}")
 
-        # Update the display
-        pygame.display.flip()
+    def autosave(self):
+        """
+        Saves the game to the autosave. After the first autosave only the changes are written, and the disk
+        is written on a worker thread so moving never waits for it.
+        """
+        try:
+            self.autosave_file.save(self.dungeon, self.player_position, self.character, background=True)
+        except (OSError, ValueError) as e:
+            self.show_message(f"Error autosaving game: {e}")
+
+    def quick_load(self):
+        """
+        Restores the game saved to the quick save. A missing or damaged save is reported and the game goes on.
+        """
+        try:
+            dungeon, position, character = self.save_file.load()
+        except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+            self.show_message(f"Error loading game: {e}")
+            return
+        self.dungeon = dungeon
+        self.player_position = tuple(position)
+        self.character = character
+        self.dungeon.visit(*self.player_position)
+        self.update_bottom_ui()
+        self.minimap = Minimap(self.dungeon)  # Rooms visited before the save are not saved
+        self.minimap.visit(*self.player_position)
+        self.compositor.set("minimap", self.minimap.surface)
+        self.dungeon.add_listener(self.refresh_room)
+        self.viewport = None
+        if self.map_view:
+            self.show_map(True)
+        self.navigation = None  # Indexed the old dungeon
+        self.fallback_navigation = None
+        self.auto_walk_wait = None
+
+    def toggle_auto_walk(self):
+        """
+        Starts walking to the exit, one room every AUTO_WALK_STEPS logic steps along a shortest path around
+        AUTO_WALK_AVOIDED_EVENTS, or through any room when no such path leads there, or stops walking.
+        """
+        if self.auto_walk_wait is not None:
+            self.auto_walk_wait = None
+            return
+        if self.navigation is None:
+            try:
+                self.navigation = NavigationIndex(self.dungeon, AUTO_WALK_AVOIDED_EVENTS)
+                self.fallback_navigation = NavigationIndex(self.dungeon)
+            except ValueError as e:
+                print(f"Auto-walk is not available: {e}")
+                return
+        self.auto_walk_wait = 0
+
+    def auto_walk(self):
+        """
+        Makes the next move of an auto-walk, stopping at the exit. Takes the shortest path through any room
+        when no safe path leads there.
+        """
+        direction = self.navigation.next_step_to_exit(*self.player_position) \
+            or self.fallback_navigation.next_step_to_exit(*self.player_position)
+        if direction is None:
+            self.auto_walk_wait = None
+            return
+        self.move(direction)
+        self.auto_walk_wait = AUTO_WALK_STEPS
+
+    def toggle_map(self):
+        """
+        Switches between the room and the map.
+        """
+        self.show_map(not self.map_view)
+
+    def show_map(self, shown):
+        """
+        Shows the map in place of the room and its description, or the room again.
+        The map opens centred on the player's room.
+        """
+        self.map_view = shown
+        if shown:
+            if self.viewport is None:
+                self.viewport = Viewport(self.dungeon)
+                self.dungeon.add_listener(self.viewport.invalidate_room)
+            self.viewport.follow(*self.player_position, snap=True)
+            self.compositor.set("map", self.viewport.render())
+        self.compositor.set("map", visible=shown)
+        self.compositor.set("room", visible=not shown)
+        self.compositor.set("room_description", visible=not shown)
+
+    def update(self):
+        """
+        Advances auto-walk and scrolls the map one step towards the player's room while it is shown.
+        """
+        if self.auto_walk_wait is not None:
+            if self.auto_walk_wait == 0:
+                self.auto_walk()
+            else:
+                self.auto_walk_wait -= 1
+        if self.map_view:
+            self.viewport.update()
+
+    def is_static(self):
+        """
+        The new game state only changes in response to input, except while auto-walking or the map is scrolling.
+        """
+        return self.auto_walk_wait is None and not (self.map_view and self.viewport.camera.moving)
+
+    def invalidate(self, rect=None):
+        """
+        Requests a repaint of rect, or of the whole screen if no rect is given, on the next draw.
+        """
+        if rect is None:
+            super().invalidate()
+        self.compositor.invalidate(rect)
+
+    def draw(self, screen):
+        """
+        Draws the new game state to the screen.
+        Only the layers that changed since the last draw are repainted; returns the regions that changed.
+        """
+        if self.map_view and self.viewport.stale:
+            self.compositor.invalidate(self.viewport.render().get_rect())
+        return self.compositor.render(screen)
 
 
 class OptionsState(State):
@@ -0,0 +1,69 @@
+import pygame
+
+from cache import SurfaceCache
+from constants import TEXT_CACHE_BUDGET
+from metrics import metrics
+
+_fonts = {}  # Fonts by (name, size), shared by every caller
+
+
+def get_font(name=None, size=24):
+    """
+    Returns the font with the given file name (None for the default font) and size, creating it on first use.
+    """
+    font = _fonts.get((name, size))
+    if font is None:
+        font = pygame.font.Font(name, size)
+        _fonts[(name, size)] = font
+    return font
+
+
+class TextCache(SurfaceCache):
+    """
+    Cache of rendered text, keyed by (font, size, text, color, antialias).
+    Surfaces are shared between callers, so they must be copied before being modified.
+    """
+    def __init__(self, budget):
+        """
+        Initializes an empty text cache with a byte budget.
+        """
+        super().__init__(budget)
+        self.renders = 0  # Number of times text was actually rendered by a font
+
+    def render(self, text, size=24, color=(0, 0, 0), antialias=True, font=None):
+        """
+        Returns the rendered text, rendering it only on a miss.
+        """
+        key = (font, size, text, tuple(color), antialias)
+        surface = self.lookup(key)
+        if surface is None:
+            surface = get_font(font, size).render(text, antialias, color)
+            self.renders += 1
+            metrics.count("font_renders")
+            self.put(key, surface)
+        return surface
+
+    def reset_stats(self):
+        """
+        Resets the hit, miss, eviction and render counters.
+        """
+        super().reset_stats()
+        self.renders = 0
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache counters.
+        """
+        stats = super().stats()
+        stats["renders"] = self.renders
+        return stats
+
+
+text_cache = TextCache(TEXT_CACHE_BUDGET)  # The process-wide text cache
+
+
+def render_text(text, size=24, color=(0, 0, 0), antialias=True, font=None):
+    """
+    Renders text through the shared text cache.
+    """
+    return text_cache.render(text, size, color, antialias, font)
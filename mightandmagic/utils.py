@@ -1,32 +1,26 @@
 import pygame
-from pygame.image import load
 
-import os
-import pygame
-
-from constants import SCREEN_HEIGHT, SCREEN_WIDTH
+from cache import asset_cache
+from constants import (
+    BOTTOM_UI_HEIGHT,
+    BOTTOM_UI_PAPER_IMAGE,
+    BUTTON_BG_IMAGE,
+    DIRECTION_BUTTON_SIZE,
+    DISABLED_BUTTON_TINT,
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+)
+from metrics import metrics
+from text import render_text
 
-def image_loader(name, folder="backgrounds", with_alpha=True, scale=True):
+def image_loader(name, folder="backgrounds", with_alpha=True, scale=True, size=None):
     """
     Function to load an image.
-    The image file is located based on the provided name and folder, loaded, resized if required, and then converted based on whether it should have alpha (transparency).
+    The image file is located based on the provided name and folder, loaded, resized to size (the screen size by default) if required, and then converted based on whether it should have alpha (transparency).
+    Images are served from the shared asset cache, so the returned surface must be copied before being modified.
     """
     try:
-        # Construct the file path to the image
-        path = os.path.join("assets", folder, name)  
-
-        # Load the image from the file
-        loaded_image = pygame.image.load(path)  
-
-        # Apply scaling for backgrounds only
-        if scale:
-            loaded_image = pygame.transform.scale(loaded_image, (800, 800))  
-
-        # Convert the image based on whether it should have alpha (transparency)
-        if with_alpha:
-            return loaded_image.convert_alpha()
-        else:
-            return loaded_image.convert()
+        return asset_cache.get(name, folder, with_alpha, scale, size)
     except pygame.error as e:
         print(f"Error loading image: {e}")
         return None
@@ -34,38 +28,64 @@ class Button:
     """
     Represents a clickable button in the game.
     """
-    def __init__(self, image_path, x, y, width, height, text):
+    def __init__(self, image_path, x, y, width, height, text, callback=None):
         """
-        Initializes the button with an image, a position, width, height, and text.
+        Initializes the button with an image, a position, width, height, text, and the callback its clicks call.
         """
         self.image_path = image_path  # Store the image path
         self.rect = pygame.Rect(x, y, width, height)  # Create a rectangle with custom width and height
         self.text = text  # Text to be displayed on the button
+        self.callback = callback  # Called without arguments when the button is clicked, see InputRouter
+        self.enabled = True  # Disabled buttons are dimmed and ignore clicks
         self.load_image()
 
     def load_image(self):
         """
-        Loads the button's background image.
+        Loads the button's background image, decoded straight at the button's size and shared through the asset cache.
         """
-        self.image = image_loader(self.image_path, folder="backgrounds", with_alpha=True, scale=True)  # Load the image
-        self.image = pygame.transform.scale(self.image, (self.rect.width, self.rect.height))  # Scale image to match custom size
+        image = image_loader(self.image_path, folder="backgrounds", with_alpha=True, scale=True, size=self.rect.size)
+        self.image = image.copy()  # The cached image is shared, so the colour key is set on a copy
         # Make white color transparent
         self.image.set_colorkey((255, 255, 255))
+        self.surface = None  # The image with the text on top, rendered on first draw
+        self.disabled_surface = None  # The dimmed variant of surface, rendered when first disabled
+
+    def set_enabled(self, enabled):
+        """
+        Enables or disables the button.
+        """
+        self.enabled = enabled
+
+    def render(self):
+        """
+        Returns the button's image with its text on top, dimmed if the button is disabled. Both variants are
+        rendered on first use and kept, so toggling the button costs nothing.
+        """
+        if self.surface is None:
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            self.surface.blit(self.image, (0, 0))
+            text_surface = render_text(self.text, 24, (50, 50, 50))
+            text_rect = text_surface.get_rect(center=self.surface.get_rect().center)
+            self.surface.blit(text_surface, text_rect)
+        if self.enabled:
+            return self.surface
+        if self.disabled_surface is None:
+            self.disabled_surface = self.surface.copy()
+            self.disabled_surface.fill(DISABLED_BUTTON_TINT, special_flags=pygame.BLEND_RGB_MULT)
+        return self.disabled_surface
+
     def draw(self, screen):
         """
         Draws the button to the screen.
         """
-        screen.blit(self.image, self.rect)  # Draw the image to the screen at the position of the rectangle
-        font = pygame.font.Font(None, 24)
-        text_surface = font.render(self.text, True, (50, 50, 50))
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        screen.blit(text_surface, text_rect)
+        screen.blit(self.render(), self.rect)  # Draw the button to the screen at the position of the rectangle
+        metrics.count("blits")
 
     def is_clicked(self, event):
         """
         Checks if the button is clicked.
         """
-        if event.type == pygame.MOUSEBUTTONDOWN:  # If there is a mouse button down event
+        if event.type == pygame.MOUSEBUTTONDOWN and self.enabled:  # If there is a mouse button down event
             if self.rect.collidepoint(event.pos):  # If the position of the mouse event is within the rectangle of the button
                 return True
         return False
@@ -78,35 +98,67 @@ class BottomUI:
         self.screen = screen
         self.room_description = ""
         self.buttons = []
-        self.paper_image = image_loader("paper.jpg", folder="backgrounds", with_alpha=True, scale=False)
+        self.direction_buttons = {}  # The buttons by the direction they move in
+        self.rect = pygame.Rect(0, SCREEN_HEIGHT - BOTTOM_UI_HEIGHT, SCREEN_WIDTH, BOTTOM_UI_HEIGHT)  # Area covered by the paper
+        self.paper_image = image_loader(BOTTOM_UI_PAPER_IMAGE, folder="backgrounds", with_alpha=True, scale=True, size=self.rect.size)
+        self.panel = None  # The paper with the room description, rendered on first draw
+        self.set_buttons()
 
     def set_room_description(self, description):
-        self.room_description = description
+        """
+        Sets the room description, invalidating the rendered panel if it changed.
+        """
+        if description != self.room_description:
+            self.room_description = description
+            self.panel = None
 
     def set_buttons(self):
         """
         Sets up the buttons for North, South, East, and West directions.
+        The buttons are built once and kept; rooms only enable and disable them, see set_directions.
         """
+        if self.buttons:
+            return
+        width, height = DIRECTION_BUTTON_SIZE
         self.buttons = [
-            Button("buttonbg.jpg", 50, SCREEN_HEIGHT - 100, 100, 50, "North"),
-            Button("buttonbg.jpg", 210, SCREEN_HEIGHT - 100, 100, 50, "South"),
-            Button("buttonbg.jpg", 370, SCREEN_HEIGHT - 100, 100, 50, "East"),
-            Button("buttonbg.jpg", 530, SCREEN_HEIGHT - 100, 100, 50, "West")
+            Button(BUTTON_BG_IMAGE, 50, SCREEN_HEIGHT - 100, width, height, "North"),
+            Button(BUTTON_BG_IMAGE, 210, SCREEN_HEIGHT - 100, width, height, "South"),
+            Button(BUTTON_BG_IMAGE, 370, SCREEN_HEIGHT - 100, width, height, "East"),
+            Button(BUTTON_BG_IMAGE, 530, SCREEN_HEIGHT - 100, width, height, "West")
         ]
+        self.direction_buttons = {button.text.lower(): button for button in self.buttons}
+
+    def set_directions(self, directions):
+        """
+        Enables the buttons of the directions the room has exits in, e.g. a Room's directions, and disables the others.
+        Returns the buttons whose state changed.
+        """
+        changed = []
+        for direction, button in self.direction_buttons.items():
+            enabled = direction in directions
+            if enabled != button.enabled:
+                button.set_enabled(enabled)
+                changed.append(button)
+        return changed
 
     def draw(self):
         """
         Draws the bottom UI to the screen.
         """
-        # Draw the paper image
-        self.screen.blit(pygame.transform.scale(self.paper_image, (SCREEN_WIDTH, SCREEN_HEIGHT // 3)), (0, SCREEN_HEIGHT - (SCREEN_HEIGHT // 3)))
-
-        # Draw the room description
-        font = pygame.font.Font(None, 36)
-        text = font.render(self.room_description, True, (0, 0, 0))
-        text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - (SCREEN_HEIGHT // 6)))
-        self.screen.blit(text, text_rect)
+        # Draw the paper with the room description
+        self.screen.blit(self.panel_surface(), self.rect)
 
         # Draw the buttons
         for button in self.buttons:
             button.draw(self.screen)
+
+    def panel_surface(self):
+        """
+        Returns the paper with the room description on it, rendering it if the description changed.
+        """
+        if self.panel is None:
+            self.panel = self.paper_image.copy()
+            text = render_text(self.room_description, 36, (0, 0, 0))
+            text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - (SCREEN_HEIGHT // 6) - self.rect.top))
+            self.panel.blit(text, text_rect)
+        return self.panel
@@ -0,0 +1,210 @@
+from collections import OrderedDict
+
+import pygame
+
+from constants import (
+    CAMERA_SMOOTHING,
+    EVENT_CODES,
+    EVENTS,
+    MINIMAP_PLAYER_COLOR,
+    ROOM_IMAGE_SIZE,
+    ROOM_IMAGES,
+    VIEWPORT_CHUNK_TILES,
+    VIEWPORT_MAX_CHUNKS,
+    VIEWPORT_TILE_SIZE,
+)
+from utils import image_loader
+
+
+class TileAtlas:
+    """
+    The tiles of every event side by side on one surface, so drawing a tile is a blit of an area of the atlas.
+    """
+    def __init__(self, tile_size=VIEWPORT_TILE_SIZE):
+        """
+        Builds the atlas from the first room image of each event, scaled to tile_size, in the order of the event codes.
+        """
+        self.tile_size = tile_size
+        self.surface = pygame.Surface((tile_size * len(EVENTS), tile_size))
+        self.areas = []  # The area of the atlas holding each event's tile, by event code
+        for code, event in enumerate(EVENTS):
+            area = pygame.Rect(code * tile_size, 0, tile_size, tile_size)
+            image = image_loader(ROOM_IMAGES[event][0], with_alpha=False, size=(tile_size, tile_size))
+            if image is not None:
+                self.surface.blit(image, area)
+            pygame.draw.rect(self.surface, (0, 0, 0), area, 1)  # Outline every tile so rooms stay apart
+            self.areas.append(area)
+
+
+class Camera:
+    """
+    The position of the viewport over the map in pixels. It glides towards its target a fraction of the way
+    every logic step, so the view scrolls smoothly when the player moves.
+    """
+    def __init__(self, size):
+        """
+        Initializes a camera showing size (width, height) pixels of the map from its top left corner.
+        """
+        self.width, self.height = size
+        self.x = 0.0  # Left edge of the view on the map
+        self.y = 0.0  # Top edge of the view on the map
+        self.target = (0.0, 0.0)  # Where the camera is gliding to
+
+    @property
+    def moving(self):
+        """
+        Whether the camera has not reached its target yet.
+        """
+        return (self.x, self.y) != self.target
+
+    def follow(self, x, y, map_width, map_height, snap=False):
+        """
+        Sets the target so the map point (x, y) is centred, without showing past the edges of the map.
+        A map smaller than the view is centred instead. snap moves the camera there at once.
+        """
+        def clamp(centre, view, extent):
+            if extent <= view:
+                return (extent - view) / 2
+            return min(max(centre - view / 2, 0), extent - view)
+
+        self.target = (clamp(x, self.width, map_width), clamp(y, self.height, map_height))
+        if snap:
+            self.x, self.y = self.target
+
+    def update(self):
+        """
+        Moves the camera towards its target. Returns True if it moved.
+        """
+        if not self.moving:
+            return False
+        target_x, target_y = self.target
+        self.x += (target_x - self.x) * CAMERA_SMOOTHING
+        self.y += (target_y - self.y) * CAMERA_SMOOTHING
+        if abs(target_x - self.x) < 0.5 and abs(target_y - self.y) < 0.5:
+            self.x, self.y = target_x, target_y
+        return True
+
+    def rect(self):
+        """
+        The area of the map in view, in whole pixels.
+        """
+        return pygame.Rect(round(self.x), round(self.y), self.width, self.height)
+
+
+class Viewport:
+    """
+    A scrolling top-down view of a dungeon's rooms as tiles.
+
+    The map is split into chunks of VIEWPORT_CHUNK_TILES x VIEWPORT_CHUNK_TILES rooms. A chunk is drawn once from the
+    tile atlas onto its own surface and kept in a least recently used cache, and a frame only blits the chunks
+    overlapping the view in one Surface.blits call. The cost of a frame therefore depends on the size of the view,
+    not of the dungeon.
+    """
+    def __init__(self, dungeon, size=ROOM_IMAGE_SIZE, tile_size=VIEWPORT_TILE_SIZE,
+                 chunk_tiles=VIEWPORT_CHUNK_TILES, max_chunks=VIEWPORT_MAX_CHUNKS):
+        """
+        Initializes a view of size (width, height) pixels over the dungeon.
+        """
+        self.dungeon = dungeon
+        self.atlas = TileAtlas(tile_size)
+        self.tile_size = tile_size
+        self.chunk_tiles = chunk_tiles  # Width and height of a chunk in rooms
+        self.chunk_pixels = chunk_tiles * tile_size  # Width and height of a chunk in pixels
+        self.max_chunks = max_chunks  # Chunk surfaces kept before the least recently drawn is dropped
+        self.chunks = OrderedDict()  # Chunk surfaces by (chunk row, chunk column), least recently drawn first
+        self.camera = Camera(size)
+        self.surface = pygame.Surface(size)  # The view, redrawn by render()
+        self.player = (0, 0)  # The room the player is in
+        self.stale = True  # Whether the view must be redrawn
+
+    def map_size(self):
+        """
+        Returns the width and height of the whole map in pixels.
+        """
+        extent = self.dungeon.size * self.tile_size
+        return extent, extent
+
+    def follow(self, i, j, snap=False):
+        """
+        Marks the room at row i, column j as the player's and glides the camera to it, or moves it there at once
+        if snap is set.
+        """
+        self.player = (i, j)
+        half = self.tile_size / 2
+        self.camera.follow(j * self.tile_size + half, i * self.tile_size + half, *self.map_size(), snap=snap)
+        self.stale = True
+
+    def update(self):
+        """
+        Advances the camera by one logic step. Returns True if the view must be redrawn.
+        """
+        if self.camera.update():
+            self.stale = True
+        return self.stale
+
+    def chunk_surface(self, chunk):
+        """
+        Returns the surface of a chunk, drawing its tiles from the atlas in one batch if it is not cached.
+        """
+        surface = self.chunks.get(chunk)
+        if surface is not None:
+            self.chunks.move_to_end(chunk)
+            return surface
+        first_row, first_column = chunk[0] * self.chunk_tiles, chunk[1] * self.chunk_tiles
+        rows = min(self.chunk_tiles, self.dungeon.size - first_row)
+        columns = min(self.chunk_tiles, self.dungeon.size - first_column)
+        surface = pygame.Surface((columns * self.tile_size, rows * self.tile_size))
+        atlas, areas, tile = self.atlas.surface, self.atlas.areas, self.tile_size
+        event_at = self.dungeon.event_at
+        surface.blits(
+            [
+                (atlas, (column * tile, row * tile), areas[EVENT_CODES[event_at(first_row + row, first_column + column)]])
+                for row in range(rows)
+                for column in range(columns)
+            ],
+            doreturn=False,
+        )
+        self.chunks[chunk] = surface
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def invalidate_room(self, i, j):
+        """
+        Drops the cached chunk holding the room at row i, column j, e.g. after the room's event changed.
+        """
+        self.chunks.pop((i // self.chunk_tiles, j // self.chunk_tiles), None)
+        self.stale = True
+
+    def visible_chunks(self):
+        """
+        Returns the chunks overlapping the view, culling every other chunk of the map.
+        """
+        view = self.camera.rect()
+        last = (self.dungeon.size - 1) // self.chunk_tiles
+        first_row, last_row = max(view.top // self.chunk_pixels, 0), min((view.bottom - 1) // self.chunk_pixels, last)
+        first_column = max(view.left // self.chunk_pixels, 0)
+        last_column = min((view.right - 1) // self.chunk_pixels, last)
+        return [(row, column) for row in range(first_row, last_row + 1) for column in range(first_column, last_column + 1)]
+
+    def render(self):
+        """
+        Redraws the view if it is stale and returns its surface.
+        """
+        if not self.stale:
+            return self.surface
+        view = self.camera.rect()
+        self.surface.fill((0, 0, 0))
+        chunks = self.visible_chunks()
+        self.surface.blits(
+            [
+                (self.chunk_surface(chunk), (chunk[1] * self.chunk_pixels - view.x, chunk[0] * self.chunk_pixels - view.y))
+                for chunk in chunks
+            ],
+            doreturn=False,
+        )
+        i, j = self.player
+        marker = pygame.Rect(j * self.tile_size - view.x, i * self.tile_size - view.y, self.tile_size, self.tile_size)
+        pygame.draw.rect(self.surface, MINIMAP_PLAYER_COLOR, marker, 3)
+        self.stale = False
+        return self.surface